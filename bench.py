@@ -0,0 +1,525 @@
+"""Performans olcumleri - YouTube'a gitmeden yerel stub sunucu ile calisir.
+
+Kullanim:
+  python bench.py feeds [kanal_sayisi] [gecikme_ms]   - Paralel feed taramasi
+  python bench.py feedcache [kanal_sayisi] [gecikme_ms] - Conditional GET cache
+  python bench.py store [video_sayisi]                 - SQLite store vs JSON dosyasi
+  python bench.py parse [entry_sayisi] [max_videos]    - Streaming vs tam Atom parse
+  python bench.py stats [kayit_sayisi]                 - Istatistik logu yazma ve akis halinde ozet
+  python bench.py startup [tekrar]                     - Komut basina baslangic suresi (-X importtime), butce kontrolu
+  python bench.py replay [info_ms] [indirme_ms] [video_kb] - Sahte YouTube ile uctan uca monitor, 10/100/1000 kanal
+                                                        (sonuc BENCH_OUTPUT, varsayilan bench_replay.json)
+"""
+import os
+import sys
+import time
+import json
+import hashlib
+import platform
+import resource
+import logging
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+def make_channel_id(index):
+    return "UC" + f"{index:022d}"
+
+
+def make_atom_feed(channel_id, entries=15):
+    """YouTube videos.xml formatinda sahte Atom feed"""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+        'xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">',
+        f"<yt:channelId>{channel_id}</yt:channelId>",
+        f"<title>Kanal {channel_id}</title>",
+    ]
+    for i in range(entries):
+        video_id = f"{channel_id[-6:]}{i:05d}"
+        parts.append(
+            "<entry>"
+            f"<id>yt:video:{video_id}</id>"
+            f"<yt:videoId>{video_id}</yt:videoId>"
+            f"<yt:channelId>{channel_id}</yt:channelId>"
+            f"<title>Video {i}</title>"
+            f"<author><name>Kanal {channel_id}</name></author>"
+            f"<published>2026-01-{(i % 28) + 1:02d}T12:00:00+00:00</published>"
+            f"<updated>2026-01-{(i % 28) + 1:02d}T12:00:00+00:00</updated>"
+            "<media:group>"
+            f'<media:thumbnail url="https://i.ytimg.com/vi/{video_id}/hqdefault.jpg" width="480" height="360"/>'
+            f"<media:description>{'aciklama ' * 40}</media:description>"
+            "</media:group>"
+            "</entry>"
+        )
+    parts.append("</feed>")
+    return "".join(parts).encode("utf-8")
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # Varsayilan listen kuyrugu (5) paralel baglantilarda SYN tekrarina (1 sn) yol acar
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class StubFeedServer:
+    """Kanal basina sabit Atom XML donen yerel HTTP sunucu"""
+    def __init__(self, latency=0.0, entries=15, etags=True):
+        self.latency = latency
+        self.entries = entries
+        self.etags = etags
+        self.feeds = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.requests += 1
+                query = parse_qs(urlparse(self.path).query)
+                channel_id = query.get("channel_id", [""])[0]
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.get_feed(channel_id)
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if server.etags and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml")
+                if server.etags:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = StubHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def get_feed(self, channel_id):
+        if channel_id not in self.feeds:
+            self.feeds[channel_id] = make_atom_feed(channel_id, self.entries)
+        return self.feeds[channel_id]
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/feeds/videos.xml"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_downloader(server, channels, **env):
+    """Gecici dizinde downloader - calisilan dizindeki veritabani, istatistik ve cookie dosyalarina dokunmaz"""
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ["YOUTUBE_CHANNELS"] = ",".join(
+        f"https://www.youtube.com/channel/{make_channel_id(i)}" for i in range(channels)
+    )
+    os.environ["FEED_BASE_URL"] = server.url
+    os.environ["FEED_CACHE_FILE"] = os.path.join(workdir, "feed_cache.json")
+    os.environ["DB_FILE"] = os.path.join(workdir, "videos.db")
+    os.environ["STATS_FILE"] = os.path.join(workdir, "stats.jsonl")
+    os.environ["COOKIE_JAR_FILE"] = os.path.join(workdir, "cookies.txt")
+    os.environ["DOWNLOAD_DIR"] = os.path.join(workdir, "downloads")
+    os.environ["METRICS_PORT"] = "0"
+    for key, value in env.items():
+        os.environ[key] = str(value)
+
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+    return main.YouTubeDownloader()
+
+
+def bench_feeds(channels=300, latency_ms=200):
+    """Seri (1 worker) ve paralel feed taramasini karsilastir"""
+    with StubFeedServer(latency=latency_ms / 1000) as server:
+        results = {}
+        for label, env in (
+            ("seri", {"FEED_WORKERS": 1, "FEED_RATE": 0}),
+            ("paralel", {"FEED_WORKERS": 32, "FEED_PER_HOST": 32, "FEED_RATE": 0}),
+            ("paralel+limit", {"FEED_WORKERS": 32, "FEED_PER_HOST": 16, "FEED_RATE": 100}),
+        ):
+            # Her senaryo bos cache ile baslar (make_downloader yeni gecici dizin acar)
+            downloader = make_downloader(server, channels, **env)
+            started = time.monotonic()
+            videos = downloader.poll_channels(downloaded_videos=set())
+            elapsed = time.monotonic() - started
+            results[label] = elapsed
+            http = downloader.get_http_stats()
+            print(f"{label:15s} {channels} kanal, {len(videos)} video, {elapsed:.2f} sn, {http['connections']} baglanti / {http['requests']} istek")
+    return results
+
+
+def bench_feed_cache(channels=300, latency_ms=50):
+    """Soguk ve sicak (ETag / ayni icerik) feed cache ile tarama"""
+    for etags in (True, False):
+        with StubFeedServer(latency=latency_ms / 1000, etags=etags) as server:
+            downloader = make_downloader(server, channels, FEED_WORKERS=32, FEED_PER_HOST=32, FEED_RATE=0)
+            mode = "etag" if etags else "hash"
+            for label in ("soguk", "sicak"):
+                started = time.monotonic()
+                downloader.poll_channels(downloaded_videos=set())
+                elapsed = time.monotonic() - started
+                print(f"{mode:5s} {label:6s} {elapsed:.2f} sn, cache: {downloader.feed_cache_stats}")
+
+
+def bench_store(total=1000000, samples=10000):
+    """Buyuk veritabaninda uyelik kontrolu ve tek kayit ekleme maliyeti"""
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp()
+    store = main.VideoStore(os.path.join(workdir, "videos.db"))
+    video_ids = [f"v{i:010d}" for i in range(total)]
+
+    started = time.monotonic()
+    for i in range(0, total, 50000):
+        store.add_many((video_id, "kanal", None, None, None, None) for video_id in video_ids[i:i + 50000])
+    print(f"sqlite  doldurma: {total} video, {time.monotonic() - started:.2f} sn")
+
+    started = time.perf_counter()
+    hits = sum(1 for i in range(samples) if video_ids[(i * 7919) % total] in store)
+    misses = sum(1 for i in range(samples) if f"yok{i}" in store)
+    elapsed = time.perf_counter() - started
+    print(f"sqlite  uyelik:   {elapsed / (2 * samples) * 1e6:.1f} us/sorgu ({hits} hit, {samples - misses} miss)")
+
+    # Tarama plani - adaylarin yarisi yeni, hepsi parti basina tek IN sorgusuyla
+    candidates = [video_ids[(i * 7919) % total] if i % 2 else f"yok{i}" for i in range(samples)]
+    started = time.perf_counter()
+    known = store.known(candidates)
+    elapsed = time.perf_counter() - started
+    print(f"sqlite  toplu:    {elapsed / samples * 1e6:.1f} us/aday ({len(known)} bilinen / {samples} aday)")
+
+    inserts = min(samples, 1000)
+    started = time.perf_counter()
+    for i in range(inserts):
+        store.add(f"yeni{i}", channel="kanal", title="Video")
+    elapsed = time.perf_counter() - started
+    print(f"sqlite  ekleme:   {elapsed / inserts * 1e3:.3f} ms/video (tek transaction)")
+
+    # Eski yontem: tum JSON dosyasini oku, bir ID ekle, tekrar yaz
+    json_file = os.path.join(workdir, "downloaded_videos.json")
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(video_ids, f, indent=2)
+    started = time.perf_counter()
+    with open(json_file, "r", encoding="utf-8") as f:
+        downloaded = set(json.load(f))
+    downloaded.add("yeni")
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(list(downloaded), f, ensure_ascii=False, indent=2)
+    print(f"json    ekleme:   {(time.perf_counter() - started) * 1e3:.1f} ms/video")
+
+
+def measure(func, repeat=5):
+    """Ortalama sure (sn) ve tepe bellek (byte)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_parse(entries=5000, max_videos=5):
+    """Buyuk sentetik feed'de tam ElementTree parse ile streaming parse karsilastirmasi"""
+    import main
+    import xml.etree.ElementTree as ET
+    logging.getLogger().setLevel(logging.WARNING)
+
+    body = make_atom_feed(make_channel_id(1), entries)
+    chunks = [body[i:i + 8192] for i in range(0, len(body), 8192)]
+    downloader = main.YouTubeDownloader.__new__(main.YouTubeDownloader)
+    downloader.max_videos = max_videos
+
+    def full_parse():
+        root = ET.fromstring(body)
+        return [downloader.parse_feed_entry(e) for e in root.findall("atom:entry", main.FEED_NAMESPACES)[:max_videos]]
+
+    def stream_parse():
+        return downloader.parse_feed_stream(iter(chunks))[0]
+
+    def stream_all():
+        downloader.max_videos = entries
+        try:
+            return downloader.parse_feed_stream(iter(chunks))[0]
+        finally:
+            downloader.max_videos = max_videos
+
+    print(f"feed: {entries} entry, {len(body) / 1e6:.2f} MB, max_videos={max_videos}")
+    for label, func in (("tam parse", full_parse), ("streaming", stream_parse), ("streaming/tum", stream_all)):
+        elapsed, peak = measure(func)
+        print(f"{label:14s} {elapsed * 1e3:8.2f} ms  tepe bellek {peak / 1e6:7.2f} MB")
+
+
+def bench_stats(total=1000000, channels=300):
+    """Milyonlarca kayitlik istatistik logunda ekleme maliyeti ve sabit bellekli ozet"""
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp()
+    stats_log = main.StatsLog(os.path.join(workdir, "download_stats.jsonl"), max_bytes=64 * 1024 * 1024)
+    downloader = main.YouTubeDownloader.__new__(main.YouTubeDownloader)
+    downloader.stats_log = stats_log
+
+    started = time.perf_counter()
+    for i in range(total):
+        stats_log.append({
+            "timestamp": "2026-01-01T00:00:00", "video_id": f"v{i}", "title": f"Video {i}", "uploader": "Kanal",
+            "channel": f"kanal{i % channels}", "duration": 600, "view_count": 0, "url": "",
+            "bytes": 50_000_000, "download_seconds": 10.0
+        })
+    elapsed = time.perf_counter() - started
+    print(f"ekleme: {total} kayit, {elapsed / total * 1e6:.1f} us/kayit, {len(stats_log.segments())} parca")
+
+    started = time.perf_counter()
+    tracemalloc.start()
+    summary = downloader.summarize_download_stats()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"ozet:   {summary['total']} kayit, {len(summary['channels'])} kanal, {time.perf_counter() - started:.2f} sn, tepe bellek {peak / 1e6:.2f} MB")
+
+
+class FakeYoutubeDL:
+    """yt-dlp yerine - ayarli extract / indirme gecikmesi, indirmede diske gercek dosya yazar"""
+    def __init__(self, download_dir, info_latency, download_latency, video_bytes):
+        self.download_dir = download_dir
+        self.info_latency = info_latency
+        self.download_latency = download_latency
+        self.video_bytes = video_bytes
+
+    @staticmethod
+    def sanitize_info(info, remove_private_keys=False):
+        return {key: value for key, value in info.items() if not (remove_private_keys and key.startswith("_"))}
+
+    def extract_info(self, url, download=False):
+        time.sleep(self.info_latency)
+        video_id = parse_qs(urlparse(url).query)["v"][0]
+        info = {
+            "id": video_id, "title": f"Video {video_id}", "uploader": "Kanal", "channel_url": f"kanal-{video_id[:6]}",
+            "duration": 600, "view_count": 0, "webpage_url": url, "ext": "mp4", "filesize": self.video_bytes,
+        }
+        if download:
+            return self.process_ie_result(info, download=True)
+        return info
+
+    def process_ie_result(self, info, download=True):
+        time.sleep(self.download_latency)
+        path = os.path.join(self.download_dir, f"{info['id']}.mp4")
+        block = b"\0" * min(self.video_bytes, 1024 * 1024)
+        with open(path, "wb") as f:
+            for offset in range(0, self.video_bytes, len(block)):
+                f.write(block[:self.video_bytes - offset])
+        return {**info, "requested_downloads": [{"filepath": path}]}
+
+
+def read_proc_io():
+    """Linux'ta /proc/self/io sayaclari - yoksa bos"""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            return {key: int(value) for key, value in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+
+    def rank(p):
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+    return {
+        "count": len(values), "p50_ms": rank(50) * 1000, "p95_ms": rank(95) * 1000,
+        "p99_ms": rank(99) * 1000, "max_ms": values[-1] * 1000,
+    }
+
+
+def replay_run(channels, info_ms=20, download_ms=30, video_kb=256):
+    """Tek process'te bir kanal sayisi - ilk (hepsi yeni) ve bos (hepsi bilinen) tarama"""
+    with StubFeedServer(latency=float(os.getenv("REPLAY_FEED_LATENCY_MS", "5")) / 1000) as server:
+        downloader = make_downloader(
+            server, channels, INFO_DELAY=0, DOWNLOAD_COOLDOWN=0,
+            MAX_VIDEOS=os.getenv("REPLAY_NEW_VIDEOS", "2"), DOWNLOAD_WORKERS=os.getenv("REPLAY_DOWNLOAD_WORKERS", "8"),
+            FEED_WORKERS=32, FEED_PER_HOST=32, FEED_RATE=0, DISK_MIN_FREE_BYTES=0,
+        )
+        fake = FakeYoutubeDL(downloader.download_dir, info_ms / 1000, download_ms / 1000, video_kb * 1024)
+        downloader.get_ydl = lambda profile: fake
+
+        # Gercek metotlar sarilir - asama basina sure listesi
+        timings = {}
+        for stage, name in (("feed", "fetch_channel_videos"), ("info", "get_video_info"),
+                            ("download", "download_video"), ("job", "process_video")):
+            def timed(*args, _stage=stage, _func=getattr(downloader, name), **kwargs):
+                started = time.perf_counter()
+                try:
+                    return _func(*args, **kwargs)
+                finally:
+                    timings.setdefault(_stage, []).append(time.perf_counter() - started)
+            setattr(downloader, name, timed)
+
+        sweeps = []
+        for label in ("ilk", "bos"):
+            timings.clear()
+            io_before = read_proc_io()
+            started = time.perf_counter()
+            downloaded = downloader.monitor_channels()
+            elapsed = time.perf_counter() - started
+            io_after = read_proc_io()
+            sweeps.append({
+                "sweep": label,
+                "seconds": elapsed,
+                "downloaded": downloaded,
+                "stages": {stage: percentiles(values) for stage, values in timings.items()},
+                "io": {key: io_after[key] - io_before.get(key, 0) for key in io_after},
+            })
+    return {
+        "channels": channels,
+        "sweeps": sweeps,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "feed_requests": server.requests,
+    }
+
+
+def bench_replay(info_ms=20, download_ms=30, video_kb=256):
+    """Her kanal sayisi ayri process'te (tepe RSS karismasin), sonuclar JSON dosyasina"""
+    results = []
+    for channels in (10, 100, 1000):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "replay-run", str(channels), str(info_ms), str(download_ms), str(video_kb)],
+            stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        for sweep in result["sweeps"]:
+            stages = ", ".join(
+                f"{stage} p50 {values['p50_ms']:.1f} / p95 {values['p95_ms']:.1f} ms"
+                for stage, values in sweep["stages"].items() if values["count"]
+            )
+            print(f"{channels:5d} kanal {sweep['sweep']:4s} {sweep['seconds']:6.2f} sn, {sweep['downloaded']} video, "
+                  f"yazma {sweep['io'].get('wchar', 0) / 1e6:.1f} MB / {sweep['io'].get('syscw', 0)} syscall - {stages}")
+        print(f"{channels:5d} kanal tepe RSS {result['peak_rss_mb']:.1f} MB, {result['feed_requests']} feed istegi")
+
+    path = os.getenv("BENCH_OUTPUT", "bench_replay.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "params": {"info_ms": info_ms, "download_ms": download_ms, "video_kb": video_kb},
+            "results": results,
+        }, f, indent=2)
+    print(f"Sonuclar: {path}")
+
+
+# Komut basina import butcesi (ms) ve yuklenmemesi gereken moduller - asilirsa cikis kodu 1
+STARTUP_BUDGETS = {
+    "stats": (60, ("yt_dlp", "requests")),
+    "cleanup": (60, ("yt_dlp", "requests")),
+    "help": (60, ("yt_dlp", "requests")),
+    "download": (400, ()),
+}
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def parse_importtime(stderr):
+    """-X importtime ciktisindan ust seviye modullerin kumulatif suresi (us)"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_startup(args, workdir):
+    env = dict(os.environ, DB_FILE=os.path.join(workdir, "videos.db"), STATS_FILE=os.path.join(workdir, "stats.jsonl"),
+               DOWNLOAD_DIR=os.path.join(workdir, "downloads"), METRICS_PORT="0")
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - started, parse_importtime(result.stderr)
+
+
+def bench_startup(repeat=5):
+    """Komutlarin baslangic maliyeti - yorumlayici acilisi cikarilmis import suresi ve toplam sure"""
+    workdir = tempfile.mkdtemp()
+    baseline = run_startup(["-c", "pass"], workdir)[1]
+    commands = {
+        "stats": [MAIN_PATH, "stats"],
+        "cleanup": [MAIN_PATH, "cleanup"],
+        "help": [MAIN_PATH, "help"],
+        # Indirme yolu - yt-dlp ve requests'in gercek maliyeti (ag istegi yapmadan)
+        "download": ["-c", f"import sys; sys.path.insert(0, {os.path.dirname(MAIN_PATH)!r}); import main, yt_dlp, requests"],
+    }
+    failed = []
+    for name, args in commands.items():
+        budget, forbidden = STARTUP_BUDGETS[name]
+        walls, imports = [], []
+        loaded = set()
+        for _ in range(repeat):
+            wall, modules = run_startup(args, workdir)
+            walls.append(wall)
+            imports.append(sum(us for module, us in modules.items() if module not in baseline) / 1000)
+            loaded.update(modules)
+        import_ms = statistics.median(imports)
+        heavy = [module for module in forbidden if module in loaded]
+        ok = import_ms <= budget and not heavy
+        if not ok:
+            failed.append(name)
+        print(f"{name:9s} import {import_ms:7.1f} ms (butce {budget} ms), toplam {statistics.median(walls) * 1000:7.1f} ms"
+              f"{', yuklenmemeli: ' + ', '.join(heavy) if heavy else ''} {'OK' if ok else 'ASILDI'}")
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    command = sys.argv[1].lower() if len(sys.argv) > 1 else ""
+    args = [int(a) for a in sys.argv[2:]]
+
+    if command == "feeds":
+        bench_feeds(*args)
+    elif command == "feedcache":
+        bench_feed_cache(*args)
+    elif command == "store":
+        bench_store(*args)
+    elif command == "parse":
+        bench_parse(*args)
+    elif command == "stats":
+        bench_stats(*args)
+    elif command == "startup":
+        bench_startup(*args)
+    elif command == "replay":
+        bench_replay(*args)
+    elif command == "replay-run":
+        result = replay_run(*args)
+        print(json.dumps(result))
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
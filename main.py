@@ -1,13 +1,30 @@
 import os
+import re
 import sys
+import atexit
+import signal
+import socket
+import bisect
 import time
+import gzip
 import json
+import shutil
+import hashlib
 import logging
-import requests
+import heapq
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import queue
+import uuid
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-import yt_dlp
+from urllib.parse import urlparse
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,28 +37,1937 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-class YouTubeDownloader:
+# Kanal sayfasinda channel ID - canonical link, RSS linki veya sayfa verisi
+CHANNEL_ID_PATTERN = re.compile(
+    rb'<link rel="canonical" href="https?://www\.youtube\.com/channel/(UC[\w-]{22})"'
+    rb'|videos\.xml\?channel_id=(UC[\w-]{22})'
+    rb'|"externalId":"(UC[\w-]{22})"'
+)
+
+# watch?v=, youtu.be/, shorts/, embed/ ve live/ URL'lerindeki video ID
+VIDEO_ID_PATTERN = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([\w-]{11})(?![\w-])")
+
+# YouTube Atom feed namespace tanımları
+FEED_NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015',
+    'media': 'http://search.yahoo.com/mrss/'
+}
+
+class Metrics:
+    """Prometheus metin formatinda counter / gauge / histogram kaydi"""
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+    
+    def __init__(self, prefix="youtubefarm"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.definitions = {}
+        self.values = {}
+        self.functions = {}
+    
+    def describe(self, name, kind, help_text, buckets=None):
+        self.definitions[name] = (kind, help_text, tuple(buckets or self.DEFAULT_BUCKETS))
+    
+    def key(self, labels):
+        return tuple(sorted(labels.items()))
+    
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            key = self.key(labels)
+            series[key] = series.get(key, 0) + value
+    
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values.setdefault(name, {})[self.key(labels)] = value
+    
+    def set_function(self, name, func):
+        """Gauge degeri okuma aninda hesaplanir (ornek: kuyruk derinligi)"""
+        with self.lock:
+            self.functions[name] = func
+    
+    def observe(self, name, value, **labels):
+        buckets = self.definitions[name][2]
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            key = self.key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+    
+    def format_labels(self, key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        escaped = []
+        for label, value in pairs:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{label}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+    
+    def render(self):
+        with self.lock:
+            values = {name: dict(series) for name, series in self.values.items()}
+            functions = dict(self.functions)
+        for name, func in functions.items():
+            try:
+                values[name] = {(): func()}
+            except Exception as e:
+                logger.debug(f"Metrik okunamadi {name}: {e}")
+        
+        lines = []
+        for name, (kind, help_text, buckets) in self.definitions.items():
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for key, value in sorted(values.get(name, {}).items()):
+                if kind != "histogram":
+                    lines.append(f"{full_name}{self.format_labels(key)} {value}")
+                    continue
+                for bound, count in zip(buckets, value["buckets"]):
+                    lines.append(f"{full_name}_bucket{self.format_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{full_name}_bucket{self.format_labels(key, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{full_name}_sum{self.format_labels(key)} {value['sum']}")
+                lines.append(f"{full_name}_count{self.format_labels(key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.describe("feed_fetch_seconds", "histogram", "Feed istegi cevap basliklarina kadar gecen sure")
+metrics.describe("feed_parse_seconds", "histogram", "Feed govdesini okuma ve parse suresi", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+metrics.describe("feed_cache_total", "counter", "Feed cache sonuclari (not_modified / unchanged / miss)")
+metrics.describe("channel_source_total", "counter", "Kanal listesi kaynagi (rss / chrome_cookie / android) ve sonucu")
+metrics.describe("extract_info_seconds", "histogram", "yt-dlp extract_info suresi (profil bazli)")
+metrics.describe("ydl_attempts_total", "counter", "yt-dlp denemeleri (asama, profil, sonuc)")
+metrics.describe("download_seconds", "histogram", "Video indirme ve post-processing suresi", buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+metrics.describe("download_bytes_total", "counter", "Indirilen toplam byte")
+metrics.describe("download_speed_bytes", "histogram", "Video basina indirme hizi (byte/sn)", buckets=(1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8))
+metrics.describe("download_queue_wait_seconds", "histogram", "Indirme isinin kuyrukta bekleme suresi")
+metrics.describe("download_queue_depth", "gauge", "Baslamayi bekleyen indirme isi sayisi")
+metrics.describe("downloads_total", "counter", "Tamamlanan indirme isleri (ok / failed / skipped)")
+metrics.describe("disk_reserved_bytes", "gauge", "Calisan indirmeler icin rezerve edilen disk alani")
+metrics.describe("disk_admission_total", "counter", "Disk alani kontrolu sonuclari (admitted / rejected)")
+metrics.describe("format_choice_total", "counter", "Format planlayici secimleri (progressive / merge / static)")
+metrics.describe("merge_seconds", "histogram", "yt-dlp ffmpeg birlestirme suresi")
+metrics.describe("sidecar_total", "counter", "Metadata ve altyazi isleri (ok / duplicate / failed / skipped)")
+metrics.describe("postprocess_seconds", "histogram", "ffmpeg son islem adiminin suresi")
+metrics.describe("postprocess_total", "counter", "Son islem adimlari (ok / skipped / failed / cancelled)")
+
+class MetricsServer:
+    """/metrics endpoint'i - arka plan thread'inde yerel HTTP sunucu"""
+    def __init__(self, port, host="0.0.0.0"):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        logger.info(f"Metrik endpoint'i: http://{host}:{self.httpd.server_address[1]}/metrics")
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class DiskAdmission:
+    """Indirme oncesi disk alani rezervasyonu - bos alan, diger indirmelerin henuz yazilmamis kismi dusulerek hesaplanir"""
+    def __init__(self, path, min_free=0, wait_timeout=600, on_shortage=None):
+        self.path = path
+        self.min_free = min_free
+        self.wait_timeout = wait_timeout
+        self.on_shortage = on_shortage
+        self.cond = threading.Condition()
+        self.reserved = {}
+        self.written = {}
+    
+    def outstanding(self):
+        # Yazilan kisim zaten bos alandan dusuldu - sadece kalan rezervasyon sayilir
+        return sum(max(0, size - sum(self.written[job].values())) for job, size in self.reserved.items())
+    
+    def available(self):
+        return shutil.disk_usage(self.path).free - self.outstanding() - self.min_free
+    
+    def reserve(self, job, size):
+        """Yer varsa rezerve et - yoksa bir kere temizlik dene, sonra diger indirmelerin bitmesini bekle"""
+        deadline = time.monotonic() + self.wait_timeout
+        cleaned = False
+        with self.cond:
+            while True:
+                shortage = size - self.available()
+                if shortage <= 0:
+                    self.reserved[job] = size
+                    self.written[job] = {}
+                    metrics.set("disk_reserved_bytes", sum(self.reserved.values()))
+                    return True
+                if not cleaned and self.on_shortage:
+                    cleaned = True
+                    # Temizlik dosya sildigi icin kilit disinda calisir
+                    self.cond.release()
+                    try:
+                        self.on_shortage(shortage)
+                    except Exception as e:
+                        logger.error(f"Disk temizligi basarisiz: {e}")
+                    finally:
+                        self.cond.acquire()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.reserved:
+                    # Bekleyecek baska indirme yoksa yer acilmayacak
+                    return False
+                logger.info(f"Disk alani yetersiz ({shortage / 1e6:.0f} MB eksik), calisan indirmeler bekleniyor: {job}")
+                self.cond.wait(remaining)
+    
+    def progress(self, job, key, written):
+        with self.cond:
+            if job in self.written:
+                self.written[job][key] = written
+    
+    def release(self, job):
+        with self.cond:
+            self.reserved.pop(job, None)
+            self.written.pop(job, None)
+            metrics.set("disk_reserved_bytes", sum(self.reserved.values()))
+            self.cond.notify_all()
+    
+    @contextmanager
+    def admit(self, job, size):
+        admitted = self.reserve(job, size)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(job)
+
+class StageProfiler:
+    """Asama bazli cProfile - worker thread'lerindeki cagrilar da asamaya eklenir
+    
+    Python 3.12+ process basina tek aktif profiler'a izin verir: ayni anda tek cagri profillenir,
+    o sirada baska thread'lerdeki cagrilar profilsiz calisir ve atlanan olarak sayilir.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.stats = {}
+        self.skipped = {}
+        self.lock = threading.Lock()
+        self.active = threading.Lock()
+    
+    def wrap(self, stage, func):
+        import cProfile
+        import pstats
+        
+        def wrapper(*args, **kwargs):
+            if not self.active.acquire(blocking=False):
+                return unprofiled(args, kwargs)
+            try:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Baska bir profil araci (ornegin disaridan) aktif
+                    return unprofiled(args, kwargs)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    with self.lock:
+                        if stage in self.stats:
+                            self.stats[stage].add(profile)
+                        else:
+                            self.stats[stage] = pstats.Stats(profile)
+            finally:
+                self.active.release()
+        
+        def unprofiled(args, kwargs):
+            with self.lock:
+                self.skipped[stage] = self.skipped.get(stage, 0) + 1
+            return func(*args, **kwargs)
+        return wrapper
+    
+    def dump(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            for stage, stats in self.stats.items():
+                path = os.path.join(self.directory, f"{stage}.prof")
+                stats.dump_stats(path)
+                logger.info(f"Profil kaydedildi ({stage}): {path}, profilsiz calisan cagri: {self.skipped.get(stage, 0)}")
+
+class TokenBucket:
+    """Basit token bucket - saniyede `rate` token, en fazla `capacity` birikir"""
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, amount=1):
+        # rate <= 0 ise limit yok
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Borca gir, borc kapanana kadar bekle - sira adil kalir
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+def parse_video_id(url):
+    match = VIDEO_ID_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+def parse_timestamp(value):
+    """ISO 8601 zamanini unix timestamp'e cevir, bilinmiyorsa 0"""
+    if not value:
+        return 0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0
+
+# Is baska yerde yapildi (zaten indirilmis / baska worker / baska process) - basari ya da hata sayilmaz
+JOB_SKIPPED = object()
+
+class DownloadScheduler:
+    """Paralel indirme havuzu - kanal bazli round-robin, kanal icinde en yeni video once"""
+    def __init__(self, handler, workers=1):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queues = {}
+        self.ready = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.seq = 0
+        self.threads = []
+        self.metrics = []
+    
+    def submit(self, job, channel, published=0):
+        with self.cond:
+            heap = self.queues.setdefault(channel, [])
+            if not heap:
+                self.ready.append(channel)
+            self.seq += 1
+            heapq.heappush(heap, (-published, self.seq, time.monotonic(), job))
+            self.cond.notify()
+    
+    def depth(self):
+        with self.cond:
+            return sum(len(heap) for heap in self.queues.values())
+    
+    def next_job(self):
+        with self.cond:
+            while not self.ready:
+                if self.closed:
+                    return None
+                self.cond.wait()
+            # Her kanal sirayla bir is alir - yogun kanal digerlerini bekletmez
+            channel = self.ready.popleft()
+            heap = self.queues[channel]
+            _, _, enqueued, job = heapq.heappop(heap)
+            if heap:
+                self.ready.append(channel)
+            return channel, enqueued, job
+    
+    def worker(self):
+        while True:
+            item = self.next_job()
+            if item is None:
+                return
+            channel, enqueued, job = item
+            started = time.monotonic()
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                logger.error(f"Indirme isi hatasi {job.get('url')}: {e}")
+                result = None
+            finished = time.monotonic()
+            
+            size = 0
+            if isinstance(result, str) and os.path.exists(result):
+                size = os.path.getsize(result)
+            skipped = result is JOB_SKIPPED
+            metric = {
+                "video_id": job.get("id"),
+                "channel": channel,
+                "ok": bool(result) and not skipped,
+                "skipped": skipped,
+                "queue_wait": started - enqueued,
+                "transfer_time": finished - started,
+                "bytes": size
+            }
+            with self.cond:
+                self.metrics.append(metric)
+            metrics.observe("download_queue_wait_seconds", metric["queue_wait"])
+            metrics.inc("downloads_total", result="skipped" if skipped else "ok" if metric["ok"] else "failed")
+            logger.info(f"Indirme isi bitti: {metric['video_id']} - kuyruk {metric['queue_wait']:.1f} sn, transfer {metric['transfer_time']:.1f} sn, {size / 1e6:.1f} MB")
+    
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.worker, name=f"download-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def cancel_pending(self):
+        """Henuz baslamamis isleri kuyruktan at, calisanlara dokunma"""
+        with self.cond:
+            dropped = sum(len(heap) for heap in self.queues.values())
+            self.queues = {}
+            self.ready.clear()
+            return dropped
+    
+    def join(self):
+        """Yeni is kabul etme, kuyruktakileri bitir ve worker'lari bekle"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+    
+    def summary(self):
+        with self.cond:
+            metrics = list(self.metrics)
+        done = [m for m in metrics if m["ok"]]
+        waits = sorted(m["queue_wait"] for m in metrics)
+        transfer = sum(m["transfer_time"] for m in done)
+        total_bytes = sum(m["bytes"] for m in done)
+        return {
+            "jobs": len(metrics),
+            "succeeded": len(done),
+            "skipped": sum(1 for m in metrics if m["skipped"]),
+            "avg_queue_wait": sum(waits) / len(waits) if waits else 0,
+            "p95_queue_wait": waits[int(len(waits) * 0.95)] if waits else 0,
+            "avg_transfer_time": transfer / len(done) if done else 0,
+            "bytes": total_bytes,
+            "throughput": total_bytes / transfer if transfer else 0
+        }
+
+# ffmpeg son islem adimlari - ad: (cikti uzantisi, komut olusturan fonksiyon)
+POSTPROCESS_STEPS = {}
+
+def postprocess_step(name, extension):
+    """Yeni son islem adimi kaydet - fonksiyon (kaynak, cikti) alip ffmpeg komutu dondurur"""
+    def register(func):
+        POSTPROCESS_STEPS[name] = (extension, func)
+        return func
+    return register
+
+@postprocess_step("remux", ".mp4")
+def remux_command(source, output):
+    return ["ffmpeg", "-y", "-v", "error", "-i", source, "-map", "0", "-c", "copy", "-movflags", "+faststart", output]
+
+@postprocess_step("thumbnail", ".jpg")
+def thumbnail_command(source, output):
+    return ["ffmpeg", "-y", "-v", "error", "-i", source, "-vf", "thumbnail,scale=640:-2", "-frames:v", "1", output]
+
+@postprocess_step("loudnorm", ".mp4")
+def loudnorm_command(source, output):
+    return [
+        "ffmpeg", "-y", "-v", "error", "-i", source, "-map", "0:v?", "-map", "0:a?", "-c:v", "copy",
+        "-af", "loudnorm=I=-16:TP=-1.5:LRA=11", "-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart", output
+    ]
+
+def postprocess_output_path(output_dir, video_id, step):
+    """Adim ciktisi video ID ile adlandirilir - tekrar calismada var olan adim atlanir"""
+    extension = POSTPROCESS_STEPS[step][0]
+    return os.path.join(output_dir, f"{video_id}.{step}{extension}")
+
+def run_postprocess_step(step, video_id, source, output_dir, timeout=None):
+    """Tek ffmpeg adimi (process havuzunda calisir) - (durum, sure, cikti veya hata)"""
+    output = postprocess_output_path(output_dir, video_id, step)
+    if os.path.exists(output):
+        return "skipped", 0.0, output
+    
+    # Yarim kalan cikti tamamlanmis sayilmasin - gecici dosyaya yaz, bitince tasi
+    root, extension = os.path.splitext(output)
+    partial = f"{root}.part{extension}"
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.monotonic()
+    try:
+        result = subprocess.run(
+            POSTPROCESS_STEPS[step][1](source, partial),
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout
+        )
+        if result.returncode != 0:
+            error = result.stderr.decode("utf-8", "replace").strip().splitlines()
+            return "failed", time.monotonic() - started, error[-1] if error else f"ffmpeg cikis kodu {result.returncode}"
+        os.replace(partial, output)
+        return "ok", time.monotonic() - started, output
+    except subprocess.TimeoutExpired:
+        return "failed", time.monotonic() - started, f"zaman asimi ({timeout} sn)"
+    finally:
+        if os.path.exists(partial):
+            os.unlink(partial)
+
+class PostProcessPipeline:
+    """Indirme sonrasi ffmpeg adimlari - kuyruktan beslenir, ayri process havuzunda calisir
+    
+    on_complete(video_id, ok) bir videonun tum adimlari bittiginde cagrilir (hata / iptal varsa ok=False).
+    """
+    def __init__(self, steps, output_dir, workers=None, timeout=None, on_complete=None):
+        self.steps = steps
+        self.on_complete = on_complete
+        self.remaining = {}
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.pool = None
+        self.thread = None
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.results = {"ok": 0, "skipped": 0, "failed": 0, "cancelled": 0}
+    
+    def submit(self, video_id, source):
+        if isinstance(source, str) and os.path.exists(source):
+            self.queue.put((video_id, source))
+    
+    def outputs(self, video_id):
+        return [postprocess_output_path(self.output_dir, video_id, step) for step in self.steps]
+    
+    def count(self, status):
+        with self.lock:
+            self.results[status] += 1
+    
+    def dispatch(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            video_id, source = item
+            with self.lock:
+                self.remaining[video_id] = [len(self.steps), True]
+            for step in self.steps:
+                if self.cancelled.is_set():
+                    self.count("cancelled")
+                    metrics.inc("postprocess_total", step=step, result="cancelled")
+                    self.step_finished(video_id, False)
+                    continue
+                future = self.pool.submit(run_postprocess_step, step, video_id, source, self.output_dir, self.timeout)
+                with self.lock:
+                    self.pending.add(future)
+                future.add_done_callback(lambda future, step=step, video_id=video_id: self.on_done(future, step, video_id))
+    
+    def on_done(self, future, step, video_id):
+        with self.lock:
+            self.pending.discard(future)
+        if future.cancelled():
+            status = "cancelled"
+        else:
+            try:
+                status, seconds, detail = future.result()
+            except Exception as e:
+                status, seconds, detail = "failed", 0.0, str(e)
+            if status == "ok":
+                metrics.observe("postprocess_seconds", seconds, step=step)
+                logger.info(f"Son islem tamamlandi ({step}, {seconds:.1f} sn): {os.path.basename(detail)}")
+            elif status == "failed":
+                logger.error(f"Son islem basarisiz ({step}) {video_id}: {detail}")
+        self.count(status)
+        metrics.inc("postprocess_total", step=step, result=status)
+        self.step_finished(video_id, status in ("ok", "skipped"))
+    
+    def step_finished(self, video_id, ok):
+        with self.lock:
+            state = self.remaining[video_id]
+            state[0] -= 1
+            state[1] = state[1] and ok
+            if state[0] > 0:
+                return
+            del self.remaining[video_id]
+        if self.on_complete:
+            self.on_complete(video_id, state[1])
+    
+    def start(self):
+        if self.thread:
+            return
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Ana process'te feed / indirme / kilit thread'leri ve SQLite baglantilari var - fork edilmez,
+        # worker'lar temiz forkserver'dan baslar (sadece run_postprocess_step gerekir)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+        self.thread = threading.Thread(target=self.dispatch, name="postprocess", daemon=True)
+        self.thread.start()
+    
+    def cancel(self):
+        """Baslamamis adimlari iptal et - calisan ffmpeg'ler bitirilir, yarim cikti birakilmaz"""
+        self.cancelled.set()
+        with self.lock:
+            pending = list(self.pending)
+        for future in pending:
+            future.cancel()
+    
+    def join(self):
+        if not self.thread:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.pool.shutdown(wait=True, cancel_futures=self.cancelled.is_set())
+        self.thread = None
+    
+    def summary(self):
+        with self.lock:
+            return dict(self.results)
+
+# info.json yerine veritabaninda tutulan alanlar - formats / thumbnails / altyazi URL listeleri atilir
+METADATA_FIELDS = (
+    "id", "title", "description", "channel", "channel_id", "channel_url", "uploader", "uploader_id",
+    "upload_date", "timestamp", "duration", "view_count", "like_count", "comment_count", "tags",
+    "categories", "chapters", "language", "live_status", "age_limit", "width", "height", "fps",
+    "format_id", "thumbnail", "webpage_url"
+)
+
+# Ayni dil icin birden fazla format varsa ilk bulunan alinir
+SUBTITLE_FORMATS = ("vtt", "srv3", "json3", "ttml", "srv1")
+
+def trim_metadata(info):
+    return {key: info[key] for key in METADATA_FIELDS if info.get(key) is not None}
+
+def select_subtitles(info, languages):
+    """(dil, tur, format, url) - manuel altyazilar ve otomatik altyazilar ayri izler olarak"""
+    tracks = []
+    for kind, key in (("manual", "subtitles"), ("auto", "automatic_captions")):
+        available = info.get(key) or {}
+        for language in languages:
+            formats = {entry.get("ext"): entry for entry in available.get(language) or [] if entry.get("url")}
+            ext = next((ext for ext in SUBTITLE_FORMATS if ext in formats), None)
+            if ext:
+                tracks.append((language, kind, ext, formats[ext]["url"]))
+    return tracks
+
+class SidecarStore:
+    """Kirpilmis metadata ve gzip'li altyazilar - ayni icerikli izler (manuel = otomatik) bir kere saklanir"""
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS video_metadata (
+                video_id TEXT PRIMARY KEY,
+                channel TEXT,
+                data TEXT NOT NULL,
+                fetched_at REAL
+            ) WITHOUT ROWID"""
+        )
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS subtitle_blobs (
+                digest TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS video_subtitles (
+                video_id TEXT NOT NULL,
+                language TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (video_id, language, kind)
+            ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS video_subtitles_digest ON video_subtitles (digest)")
+    
+    def save_metadata(self, video_id, channel, metadata):
+        data = json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO video_metadata (video_id, channel, data, fetched_at) VALUES (?, ?, ?, ?)",
+                (video_id, channel, data, time.time())
+            )
+    
+    def metadata(self, video_id):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM video_metadata WHERE video_id = ?", (video_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_subtitle(self, video_id, language, kind, ext, content):
+        """Altyaziyi kaydet - icerik zaten varsa (baska iz / video) sadece referans eklenir, True = yeni blob"""
+        digest = hashlib.sha256(content).hexdigest()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                exists = self.conn.execute("SELECT 1 FROM subtitle_blobs WHERE digest = ?", (digest,)).fetchone()
+                if not exists:
+                    self.conn.execute(
+                        "INSERT INTO subtitle_blobs (digest, data, size) VALUES (?, ?, ?)",
+                        (digest, gzip.compress(content), len(content))
+                    )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO video_subtitles (video_id, language, kind, ext, digest) VALUES (?, ?, ?, ?, ?)",
+                    (video_id, language, kind, ext, digest)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return not exists
+    
+    def subtitle(self, video_id, language, kind=None):
+        """(format, icerik) - tur verilmezse manuel iz otomatikten once"""
+        with self.lock:
+            row = self.conn.execute(
+                """SELECT s.ext, b.data FROM video_subtitles s JOIN subtitle_blobs b ON b.digest = s.digest
+                WHERE s.video_id = ? AND s.language = ? AND (? IS NULL OR s.kind = ?)
+                ORDER BY s.kind = 'auto'""",
+                (video_id, language, kind, kind)
+            ).fetchone()
+        return (row[0], gzip.decompress(row[1])) if row else None
+    
+    def delete_subtitles(self, video_ids):
+        """Silinen videolarin altyazilari - baska videonun kullanmadigi bloblar da silinir"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany("DELETE FROM video_subtitles WHERE video_id = ?", ((video_id,) for video_id in video_ids))
+                self.conn.execute(
+                    "DELETE FROM subtitle_blobs WHERE digest NOT IN (SELECT digest FROM video_subtitles)"
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def usage(self):
+        """(metadata sayisi, altyazi izi, ham byte, saklanan byte)"""
+        with self.lock:
+            videos = self.conn.execute("SELECT COUNT(*) FROM video_metadata").fetchone()[0]
+            tracks = self.conn.execute("SELECT COUNT(*) FROM video_subtitles").fetchone()[0]
+            raw, stored = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM subtitle_blobs"
+            ).fetchone()
+        return videos, tracks, raw, stored
+
+class SidecarStage:
+    """Metadata ve altyazilar indirmeden ayri, thread havuzunda - medya indirmesi bu istekleri beklemez"""
+    def __init__(self, store, fetch, languages, workers=4, disabled_channels=()):
+        self.store = store
+        self.fetch = fetch
+        self.languages = languages
+        self.workers = workers
+        self.disabled_channels = set(disabled_channels)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.counts = {}
+    
+    def enabled(self, *channels):
+        return not any(channel in self.disabled_channels for channel in channels if channel)
+    
+    def count(self, kind, result):
+        with self.lock:
+            self.counts[result] = self.counts.get(result, 0) + 1
+        metrics.inc("sidecar_total", kind=kind, result=result)
+    
+    def submit(self, video_id, info, channel=None):
+        """Indirilen videonun yan verileri - kanal SIDECAR_DISABLED_CHANNELS icindeyse atlanir"""
+        if not self.enabled(channel, info.get("channel_id"), info.get("channel_url")):
+            self.count("video", "skipped")
+            return None
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sidecar")
+            return self.executor.submit(self.run, video_id, channel, trim_metadata(info), select_subtitles(info, self.languages))
+    
+    def run(self, video_id, channel, metadata, tracks):
+        try:
+            self.store.save_metadata(video_id, channel, metadata)
+            self.count("metadata", "ok")
+        except Exception as e:
+            self.count("metadata", "failed")
+            logger.error(f"Metadata kaydedilemedi {video_id}: {e}")
+        
+        for language, kind, ext, url in tracks:
+            try:
+                content = self.fetch(url)
+                new = self.store.save_subtitle(video_id, language, kind, ext, content)
+                self.count("subtitle", "ok" if new else "duplicate")
+            except Exception as e:
+                self.count("subtitle", "failed")
+                logger.warning(f"Altyazi alinamadi {video_id} ({language}, {kind}): {e}")
+    
+    def join(self, cancel=False):
+        """Kuyruktaki isleri bitir - cancel ise baslamamis isler birakilir"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=cancel)
+    
+    def summary(self):
+        with self.lock:
+            return ", ".join(f"{result}: {count}" for result, count in sorted(self.counts.items())) or "is yok"
+
+# Eski indirmeler indekslenirken video sayilan uzantilar - digerleri yan dosya
+MEDIA_EXTENSIONS = (".mp4", ".mkv", ".webm", ".m4a", ".mp3", ".opus", ".flv", ".mov", ".avi")
+
+class VideoStore:
+    """Indirilen videolar icin SQLite (WAL) veritabani - video_id uzerinde primary key"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                channel TEXT,
+                title TEXT,
+                downloaded_at TEXT,
+                file_path TEXT,
+                file_size INTEGER
+            ) WITHOUT ROWID"""
+        )
+        # Sonradan eklenen kolonlar - eski veritabanlari yerinde guncellenir
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(videos)")}
+        for column, kind in (("sidecars", "TEXT"), ("deleted_at", "TEXT")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE videos ADD COLUMN {column} {kind}")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS videos_stored ON videos (downloaded_at) WHERE file_path IS NOT NULL AND deleted_at IS NULL"
+        )
+        # Bir kere calisan aktarimlar
+        self.conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+    
+    def __contains__(self, video_id):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row is not None
+    
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    
+    def add(self, video_id, channel=None, title=None, file_path=None, file_size=None, sidecars=None):
+        self.add_many([(video_id, channel, title, file_path, file_size, sidecars)])
+    
+    def add_many(self, rows):
+        """(video_id, channel, title, file_path, file_size, sidecars) satirlarini tek transaction'da yaz"""
+        now = datetime.now().isoformat()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    """INSERT INTO videos (video_id, channel, title, downloaded_at, file_path, file_size, sidecars)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(video_id) DO UPDATE SET
+                        channel = COALESCE(excluded.channel, channel),
+                        title = COALESCE(excluded.title, title),
+                        downloaded_at = excluded.downloaded_at,
+                        file_path = COALESCE(excluded.file_path, file_path),
+                        file_size = COALESCE(excluded.file_size, file_size),
+                        sidecars = COALESCE(excluded.sidecars, sidecars),
+                        deleted_at = NULL""",
+                    (
+                        (row[0], row[1], row[2], now, row[3], row[4], json.dumps(row[5]) if row[5] else None)
+                        for row in rows
+                    )
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def get_file_path(self, video_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT file_path FROM videos WHERE video_id = ? AND deleted_at IS NULL", (video_id,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def stored_bytes(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COALESCE(SUM(file_size), 0) FROM videos WHERE file_path IS NOT NULL AND deleted_at IS NULL"
+            ).fetchone()[0]
+    
+    def known(self, video_ids, batch_size=500):
+        """Verilen ID'lerden veritabaninda olanlar - tek tek sorgu yerine parti basina bir IN sorgusu"""
+        video_ids = list(video_ids)
+        found = set()
+        with self.lock:
+            for start in range(0, len(video_ids), batch_size):
+                batch = video_ids[start:start + batch_size]
+                placeholders = ", ".join("?" for _ in batch)
+                found.update(
+                    row[0] for row in self.conn.execute(
+                        f"SELECT video_id FROM videos WHERE video_id IN ({placeholders})", batch
+                    )
+                )
+        return found
+    
+    def retention_candidates(self, cutoff=None, max_bytes=0, channel_quota=0):
+        """Silinecek videolar (video_id, file_path, file_size, sidecars) - en eski indirme once
+        
+        cutoff: bu zamandan once indirilenler, max_bytes: toplam boyut limiti,
+        channel_quota: kanal basina boyut limiti. Boyut limitlerinde en yeni videolar tutulur.
+        """
+        conditions = []
+        params = []
+        if cutoff:
+            conditions.append("downloaded_at < ?")
+            params.append(cutoff)
+        if max_bytes > 0:
+            conditions.append("kept_total > ?")
+            params.append(max_bytes)
+        if channel_quota > 0:
+            conditions.append("kept_channel > ?")
+            params.append(channel_quota)
+        if not conditions:
+            return []
+        
+        with self.lock:
+            return self.conn.execute(
+                f"""SELECT video_id, file_path, file_size, sidecars FROM (
+                    SELECT video_id, file_path, file_size, sidecars, downloaded_at,
+                        SUM(COALESCE(file_size, 0)) OVER (
+                            ORDER BY downloaded_at DESC, video_id ROWS UNBOUNDED PRECEDING
+                        ) AS kept_total,
+                        SUM(COALESCE(file_size, 0)) OVER (
+                            PARTITION BY channel ORDER BY downloaded_at DESC, video_id ROWS UNBOUNDED PRECEDING
+                        ) AS kept_channel
+                    FROM videos
+                    WHERE file_path IS NOT NULL AND deleted_at IS NULL
+                )
+                WHERE {" OR ".join(conditions)}
+                ORDER BY downloaded_at""",
+                params
+            ).fetchall()
+    
+    def mark_deleted(self, video_ids):
+        """Dosyalari silinen videolar - kayit kalir ki tekrar indirilmesin"""
+        now = datetime.now().isoformat()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "UPDATE videos SET deleted_at = ?, file_path = NULL, file_size = 0, sidecars = NULL WHERE video_id = ?",
+                    ((now, video_id) for video_id in video_ids)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def index_files(self, directory):
+        """Veritabaninda yolu olmayan eski indirmeleri bir kere kaydet - saklama politikasi onlari da silebilsin
+        
+        Video ID'si yandaki .info.json'dan alinir, yoksa dosya adi anahtar olur. Indirme zamani dosyanin
+        mtime'i, ayni adla baslayan dosyalar (info.json, altyazi, kucuk resim) yan dosya sayilir.
+        """
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM store_meta WHERE key = 'files_indexed'").fetchone():
+                return 0
+            known = {row[0] for row in self.conn.execute("SELECT file_path FROM videos WHERE file_path IS NOT NULL")}
+        known = {os.path.abspath(path) for path in known}
+        
+        try:
+            entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+        except FileNotFoundError:
+            entries = []
+        names = sorted(entry.name for entry in entries)
+        rows = []
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() not in MEDIA_EXTENSIONS or os.path.abspath(entry.path) in known:
+                continue
+            sidecars = [
+                os.path.join(directory, name) for name in names
+                if name.startswith(f"{stem}.") and os.path.splitext(name)[1].lower() not in MEDIA_EXTENSIONS
+            ]
+            video_id = f"file:{entry.name}"
+            info_file = os.path.join(directory, f"{stem}.info.json")
+            if info_file in sidecars:
+                try:
+                    with open(info_file, "r", encoding="utf-8") as f:
+                        video_id = json.load(f).get("id") or video_id
+                except (OSError, ValueError):
+                    pass
+            stat = entry.stat()
+            rows.append((
+                video_id, datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                entry.path, stat.st_size, json.dumps(sidecars) if sidecars else None
+            ))
+        
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                # JSON'dan aktarilan (yolu olmayan) kayitlar dosyayla eslesir, silinmis kayitlara dokunulmaz
+                self.conn.executemany(
+                    """INSERT INTO videos (video_id, downloaded_at, file_path, file_size, sidecars)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(video_id) DO UPDATE SET
+                        downloaded_at = excluded.downloaded_at,
+                        file_path = excluded.file_path,
+                        file_size = excluded.file_size,
+                        sidecars = excluded.sidecars
+                    WHERE file_path IS NULL AND deleted_at IS NULL""",
+                    rows
+                )
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO store_meta (key, value) VALUES ('files_indexed', ?)", (datetime.now().isoformat(),)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+    
+    def migrate_json(self, json_file, batch_size=10000):
+        """Eski downloaded_videos.json dosyasini bir kere veritabanina aktar"""
+        if not os.path.exists(json_file):
+            return 0
+        with open(json_file, "r", encoding="utf-8") as f:
+            video_ids = json.load(f)
+        for i in range(0, len(video_ids), batch_size):
+            batch = video_ids[i:i + batch_size]
+            self.add_many((video_id, None, None, None, None, None) for video_id in batch)
+        os.replace(json_file, f"{json_file}.migrated")
+        return len(video_ids)
+
+class JobJournal:
+    """Indirme isleri icin kalici durum kaydi - islem baslamadan once yazilir, yeniden baslatmada devam edilir"""
+    # "postprocessing" yt-dlp'nin kendi son islemleri (indirmenin parcasi, yeniden indirilir);
+    # "pipeline_pending" indirme bitti, ffmpeg pipeline'i bekleniyor - sadece resume_postprocess devam ettirir
+    ACTIVE_STATES = ("queued", "fetching_info", "downloading", "postprocessing")
+    
+    def __init__(self, path, max_attempts=5, retry_base=60, retry_max=86400, node_id=None):
+        self.node_id = node_id
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                video_id TEXT PRIMARY KEY,
+                url TEXT,
+                channel TEXT,
+                title TEXT,
+                published TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL,
+                error TEXT,
+                updated_at TEXT
+            ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, next_attempt_at)")
+        # Isi sahiplenen node - paylasilan veritabaninda ayni is iki node'da calismaz
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if "node" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN node TEXT")
+    
+    def enqueue(self, video):
+        """Yeni isi 'queued' olarak yaz - zaten varsa sadece suresi gelmis bir retry ise True
+        
+        INSERT / kosullu UPDATE tek ifade oldugu icin ayni videoyu sadece bir process sahiplenir.
+        """
+        now = datetime.now().isoformat()
+        with self.lock:
+            cursor = self.conn.execute(
+                """INSERT INTO jobs (video_id, url, channel, title, published, state, updated_at, node)
+                VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET state = 'queued', updated_at = excluded.updated_at, node = excluded.node
+                WHERE state = 'failed' AND next_attempt_at IS NOT NULL AND next_attempt_at <= ?""",
+                (video["id"], video.get("url"), video.get("channel"), video.get("title"), video.get("published"), now, self.node_id, time.time())
+            )
+            return cursor.rowcount > 0
+    
+    def set_state(self, video_id, state):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE video_id = ?",
+                (state, datetime.now().isoformat(), video_id)
+            )
+    
+    def fail(self, video_id, error):
+        """Hata say, ustel bekleme ile tekrar dene - limit asildiysa kalici hata"""
+        with self.lock:
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            next_attempt_at = None
+            if attempts < self.max_attempts:
+                next_attempt_at = time.time() + min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+            self.conn.execute(
+                """UPDATE jobs SET state = 'failed', attempts = ?, next_attempt_at = ?, error = ?, updated_at = ?
+                WHERE video_id = ?""",
+                (attempts, next_attempt_at, str(error), datetime.now().isoformat(), video_id)
+            )
+        return next_attempt_at
+    
+    def in_state(self, state, live_nodes=None):
+        """Bu durumdaki isler - live_nodes verilirse calisan baska node'larin isleri haric"""
+        with self.lock:
+            rows = self.conn.execute("SELECT video_id, node FROM jobs WHERE state = ?", (state,)).fetchall()
+        return [
+            row[0] for row in rows
+            if live_nodes is None or row[1] in (None, self.node_id) or row[1] not in live_nodes
+        ]
+    
+    def resumable(self, live_nodes=None, retries_only=False):
+        """Yarim kalmis isler ve suresi gelmis retry'lar - hepsi tekrar 'queued' olur
+        
+        live_nodes verilirse hala calisan baska bir node'un aktif islerine dokunulmaz.
+        retries_only ise sadece suresi gelmis retry'lar (calisan daemon'un kendi isleri aktif durumda).
+        """
+        states = () if retries_only else self.ACTIVE_STATES
+        placeholders = ", ".join("?" for _ in states) or "NULL"
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    f"""SELECT video_id, url, channel, title, published, state, node FROM jobs
+                    WHERE state IN ({placeholders})
+                    OR (state = 'failed' AND next_attempt_at IS NOT NULL AND next_attempt_at <= ?)""",
+                    (*states, time.time())
+                ).fetchall()
+                if live_nodes is not None:
+                    rows = [
+                        row for row in rows
+                        if row[5] == "failed" or row[6] in (None, self.node_id) or row[6] not in live_nodes
+                    ]
+                self.conn.executemany(
+                    "UPDATE jobs SET state = 'queued', node = ? WHERE video_id = ?",
+                    ((self.node_id, row[0]) for row in rows)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [
+            {"id": row[0], "url": row[1], "channel": row[2], "title": row[3], "published": row[4], "resumed_from": row[5]}
+            for row in rows
+        ]
+
+class ClusterCoordinator:
+    """Paylasilan SQLite uzerinden node kaydi, consistent hash ile kanal dagitimi ve kanal lease'leri"""
+    def __init__(self, path, node_id, lease_ttl=60, heartbeat_interval=15, vnodes=64):
+        self.node_id = node_id
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.vnodes = vnodes
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.ring = ((), [])
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS channel_leases (
+                channel TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID"""
+        )
+    
+    @staticmethod
+    def hash(value):
+        return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+    
+    def heartbeat(self):
+        """Node'u canli isaretle, sahip olunan kanal lease'lerini uzat"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO nodes (node_id, heartbeat_at) VALUES (?, ?) ON CONFLICT(node_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (self.node_id, now)
+            )
+            self.conn.execute(
+                "UPDATE channel_leases SET expires_at = ? WHERE owner = ?",
+                (now + self.lease_ttl, self.node_id)
+            )
+    
+    def live_nodes(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT node_id FROM nodes WHERE heartbeat_at > ?", (time.time() - self.lease_ttl,)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def get_ring(self, nodes):
+        # Node listesi degismediyse halka tekrar kurulmaz
+        key = tuple(sorted(nodes))
+        if self.ring[0] != key:
+            points = sorted(
+                (self.hash(f"{node}#{i}"), node) for node in key for i in range(self.vnodes)
+            )
+            self.ring = (key, points)
+        return self.ring[1]
+    
+    def ring_owner(self, channel, ring):
+        index = bisect.bisect(ring, (self.hash(channel), "")) % len(ring)
+        return ring[index][1]
+    
+    def claim_channels(self, channels):
+        """Bu node'un taramasi gereken kanallar - halka sahibi olup lease'i alabildikleri"""
+        self.heartbeat()
+        nodes = self.live_nodes() | {self.node_id}
+        ring = self.get_ring(nodes)
+        mine = [channel for channel in channels if self.ring_owner(channel, ring) == self.node_id]
+        mine_set = set(mine)
+        others = [channel for channel in channels if channel not in mine_set]
+        
+        now = time.time()
+        owned = []
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Halkaya gore artik baskasinin olan kanallari hemen birak - devir beklemesin
+                self.conn.executemany(
+                    "DELETE FROM channel_leases WHERE channel = ? AND owner = ?",
+                    ((channel, self.node_id) for channel in others)
+                )
+                for channel in mine:
+                    cursor = self.conn.execute(
+                        """INSERT INTO channel_leases (channel, owner, expires_at) VALUES (?, ?, ?)
+                        ON CONFLICT(channel) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                        WHERE owner = excluded.owner OR expires_at < ?""",
+                        (channel, self.node_id, now + self.lease_ttl, now)
+                    )
+                    if cursor.rowcount > 0:
+                        owned.append(channel)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        
+        logger.info(f"Cluster: {len(nodes)} node, {len(owned)}/{len(channels)} kanal bu node'da ({self.node_id})")
+        return owned
+    
+    def run(self):
+        while not self.stop_event.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Cluster heartbeat hatasi: {e}")
+    
+    def start(self):
+        if self.thread:
+            return
+        self.heartbeat()
+        self.thread = threading.Thread(target=self.run, name="cluster-heartbeat", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Kayittan cik ve lease'leri birak - diger node'lar kanallari hemen devralir"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        with self.lock:
+            self.conn.execute("DELETE FROM channel_leases WHERE owner = ?", (self.node_id,))
+            self.conn.execute("DELETE FROM nodes WHERE node_id = ?", (self.node_id,))
+
+class ChannelResolver:
+    """@handle, /c/ ve /user/ URL'lerinin channel ID karsiliklari - TTL'li, basarisizliklar da saklanir"""
+    def __init__(self, path, ttl=30 * 24 * 3600, negative_ttl=3600):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS channel_ids (
+                url TEXT PRIMARY KEY,
+                channel_id TEXT,
+                resolved_at REAL NOT NULL,
+                error TEXT
+            ) WITHOUT ROWID"""
+        )
+    
+    @staticmethod
+    def key(url):
+        url = url.rstrip("/")
+        if url.endswith("/videos"):
+            url = url[:-len("/videos")]
+        return url
+    
+    def lookup(self, url):
+        """Gecerli kayit varsa (channel_id, hata) - yoksa veya suresi dolduysa None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT channel_id, resolved_at, error FROM channel_ids WHERE url = ?", (self.key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        channel_id, resolved_at, error = row
+        ttl = self.ttl if channel_id else self.negative_ttl
+        if time.time() - resolved_at > ttl:
+            return None
+        return channel_id, error
+    
+    def store(self, url, channel_id, error=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO channel_ids (url, channel_id, resolved_at, error) VALUES (?, ?, ?, ?)",
+                (self.key(url), channel_id, time.time(), error)
+            )
+    
+    def store_failure(self, url, error):
+        self.store(url, None, error)
+
+class ChannelCursors:
+    """yt-dlp kanal listelemesi icin kanal basina konum - son gorulen video ve geriye donuk tarama ilerlemesi"""
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS channel_cursors (
+                channel TEXT PRIMARY KEY,
+                last_video_id TEXT,
+                backfill_position INTEGER NOT NULL DEFAULT 0,
+                backfill_done INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL
+            ) WITHOUT ROWID"""
+        )
+    
+    def get(self, channel):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_video_id, backfill_position, backfill_done FROM channel_cursors WHERE channel = ?", (channel,)
+            ).fetchone()
+        if row is None:
+            return {"last_video_id": None, "backfill_position": 0, "backfill_done": False}
+        return {"last_video_id": row[0], "backfill_position": row[1], "backfill_done": bool(row[2])}
+    
+    def set_latest(self, channel, video_id):
+        with self.lock:
+            self.conn.execute(
+                """INSERT INTO channel_cursors (channel, last_video_id, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET last_video_id = excluded.last_video_id, updated_at = excluded.updated_at""",
+                (channel, video_id, time.time())
+            )
+    
+    def set_backfill(self, channel, position, done=False):
+        with self.lock:
+            self.conn.execute(
+                """INSERT INTO channel_cursors (channel, backfill_position, backfill_done, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET backfill_position = excluded.backfill_position,
+                    backfill_done = excluded.backfill_done, updated_at = excluded.updated_at""",
+                (channel, position, int(done), time.time())
+            )
+
+# Planlayicinin degistirebildigi "en iyi" secici parcalari - worst / ext / codec filtreleri oldugu gibi kalir
+FORMAT_BEST_TOKENS = ("best", "b", "bv", "bv*", "bestvideo", "bestvideo*", "ba", "bestaudio")
+
+class FormatCache:
+    """Kanal basina son secilen format ve birlestirme maliyeti - planlayici once bu secimi dener"""
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS channel_formats (
+                channel TEXT PRIMARY KEY,
+                format_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                height INTEGER,
+                downloads INTEGER NOT NULL DEFAULT 0,
+                merges INTEGER NOT NULL DEFAULT 0,
+                merge_seconds REAL NOT NULL DEFAULT 0,
+                updated_at REAL
+            ) WITHOUT ROWID"""
+        )
+    
+    def get(self, channel):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT format_id, kind, height FROM channel_formats WHERE channel = ?", (channel,)
+            ).fetchone()
+        return {"format_id": row[0], "kind": row[1], "height": row[2]} if row else None
+    
+    def record(self, channel, format_id, kind, height=None, merge_seconds=None):
+        merged = 1 if merge_seconds is not None else 0
+        with self.lock:
+            self.conn.execute(
+                """INSERT INTO channel_formats (channel, format_id, kind, height, downloads, merges, merge_seconds, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET format_id = excluded.format_id, kind = excluded.kind,
+                    height = excluded.height, downloads = downloads + 1, merges = merges + excluded.merges,
+                    merge_seconds = merge_seconds + excluded.merge_seconds, updated_at = excluded.updated_at""",
+                (channel, format_id, kind, height, merged, merge_seconds or 0, time.time())
+            )
+
+class SingleFlight:
+    """Ayni anahtar icin process icinde tek calisma - sonradan gelenler ilk cagrinin sonucunu bekler"""
     def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+    
+    def do(self, key, func):
+        """(sonuc, paylasildi_mi) - paylasildi ise func bu cagrida calismadi"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+        
+        try:
+            call["result"] = func()
+            return call["result"], False
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call["done"].set()
+
+class VideoLocks:
+    """Video ID basina process'ler arasi kilit - paylasilan veritabaninda sureli satir, tutuldukca uzatilir"""
+    def __init__(self, path, owner, ttl=600):
+        self.owner = owner
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.held = set()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS video_locks (
+                video_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID"""
+        )
+    
+    def acquire(self, video_id):
+        """Kilit bostaysa, suresi dolduysa (process oldu) veya zaten bizimse al"""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                """INSERT INTO video_locks (video_id, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE owner = excluded.owner OR expires_at < ?""",
+                (video_id, self.owner, now + self.ttl, now)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self.held.add(video_id)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="video-locks", daemon=True)
+                self.thread.start()
+        return True
+    
+    def release(self, video_id):
+        with self.lock:
+            self.held.discard(video_id)
+            self.conn.execute("DELETE FROM video_locks WHERE video_id = ? AND owner = ?", (video_id, self.owner))
+    
+    def run(self):
+        # Uzun indirmelerde kilit suresi dolmasin
+        while not self.stop_event.wait(self.ttl / 3):
+            try:
+                with self.lock:
+                    if self.held:
+                        self.conn.execute(
+                            "UPDATE video_locks SET expires_at = ? WHERE owner = ?", (time.time() + self.ttl, self.owner)
+                        )
+            except Exception as e:
+                logger.error(f"Video kilidi uzatilamadi: {e}")
+    
+    @contextmanager
+    def hold(self, video_id):
+        acquired = self.acquire(video_id)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release(video_id)
+
+class StatsLog:
+    """Append-only JSON lines indirme istatistikleri - boyut/zaman ile dondurulur, eski parcalar gzip"""
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, max_age=7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.segment_started = None
+    
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.rotate_if_needed()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            if self.segment_started is None:
+                self.segment_started = time.time()
+    
+    def rotate_if_needed(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            self.segment_started = None
+            return
+        if self.segment_started is None:
+            self.segment_started = self.get_segment_start()
+        if size < self.max_bytes and time.time() - self.segment_started < self.max_age:
+            return
+        
+        # Aktif parcayi tarih damgali gzip dosyasina tasi
+        rotated = f"{self.path}.{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        os.replace(self.path, rotated)
+        with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.unlink(rotated)
+        self.segment_started = None
+        logger.info(f"Istatistik logu donduruldu: {rotated}.gz")
+    
+    def get_segment_start(self):
+        # Parcanin ilk kaydinin zamani, okunamazsa dosya zamani
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                first = json.loads(f.readline())
+            return datetime.fromisoformat(first["timestamp"]).timestamp()
+        except Exception:
+            return os.path.getmtime(self.path)
+    
+    def segments(self):
+        """Eskiden yeniye: dondurulmus gzip parcalar, sonra aktif dosya"""
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        rotated = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(".gz")
+        )
+        if os.path.exists(self.path):
+            rotated.append(self.path)
+        return rotated
+    
+    def __iter__(self):
+        """Kayitlari tek tek oku - bellek kullanimi kayit sayisindan bagimsiz"""
+        for segment in self.segments():
+            opener = gzip.open if segment.endswith(".gz") else open
+            with opener(segment, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Yarim yazilmis son satir
+                        continue
+    
+    def migrate_json(self, json_file):
+        """Eski download_stats.json listesini bir kere loga aktar"""
+        if not os.path.exists(json_file):
+            return 0
+        with open(json_file, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(json_file, f"{json_file}.migrated")
+        return len(entries)
+
+class CookieManager:
+    """Manuel cookie'leri bellekteki bir cookie jar'a bir kere yukler, kaynak degisince yeniler
+    
+    Diske sadece path (COOKIE_JAR_FILE) verilirse yazilir - process olurse geride duz metin cookie kalmaz.
+    """
+    def __init__(self, path=None, failure_threshold=3, cooldown=600):
+        self.path = path
+        self.jar = None
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.fingerprint = None
+        self.version = 0
+        self.count = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.disabled_until = 0
+        atexit.register(self.cleanup)
+    
+    def get_fingerprint(self):
+        # Dosya kaynagi icin sadece stat, env icin degerin kendisi
+        cookies_file = os.getenv("YOUTUBE_COOKIES_FILE", "")
+        if cookies_file:
+            try:
+                stat = os.stat(cookies_file)
+                return ("file", cookies_file, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                return ("file", cookies_file, None, None)
+        return ("env", os.getenv("YOUTUBE_COOKIES", ""))
+    
+    def read_source(self, fingerprint):
+        if fingerprint[0] == "file":
+            if fingerprint[2] is None:
+                return ""
+            with open(fingerprint[1], "r", encoding="utf-8") as f:
+                return f.read()
+        return fingerprint[1]
+    
+    def refresh(self):
+        """Bellekteki cookie jar'i dondur (cookie yoksa None), kaynak degistiyse yeniden olustur"""
+        with self.lock:
+            fingerprint = self.get_fingerprint()
+            # Jar dosyasi disaridan silindiyse kaynak ayni olsa da yeniden yazilir
+            if fingerprint == self.fingerprint and (not self.count or not self.path or os.path.exists(self.path)):
+                return self.jar if self.count else None
+            
+            self.fingerprint = fingerprint
+            self.count = 0
+            try:
+                source = self.read_source(fingerprint)
+                if not source.strip():
+                    self.cleanup()
+                    return None
+                
+                import http.cookiejar
+                cookie_jar = http.cookiejar.MozillaCookieJar()
+                cookies_dict = json.loads(source)
+                for name, value in cookies_dict.items():
+                    cookie_jar.set_cookie(http.cookiejar.Cookie(
+                        version=0, name=name, value=value,
+                        port=None, port_specified=False,
+                        domain='.youtube.com', domain_specified=True, domain_initial_dot=True,
+                        path='/', path_specified=True,
+                        secure=True, expires=None, discard=True, comment=None,
+                        comment_url=None, rest={}
+                    ))
+                
+                if self.path:
+                    # Atomik yaz - mkstemp tahmin edilemeyen isimle 0600 acar (symlink ile yonlendirilemez)
+                    fd, tmp_file = tempfile.mkstemp(prefix=".cookies_", dir=os.path.dirname(os.path.abspath(self.path)))
+                    os.close(fd)
+                    try:
+                        cookie_jar.save(tmp_file, ignore_discard=True)
+                        os.replace(tmp_file, self.path)
+                    except Exception:
+                        os.unlink(tmp_file)
+                        raise
+                
+                self.jar = cookie_jar
+                self.count = len(cookies_dict)
+                self.version += 1
+                self.consecutive_failures = 0
+                self.disabled_until = 0
+                logger.info(f"Cookie jar olusturuldu: {self.count} cookie")
+                return self.jar
+            
+            except Exception as e:
+                logger.error(f"Cookie jar olusturma hatasi: {e}")
+                return None
+    
+    def available(self):
+        if not self.refresh():
+            return False
+        return time.monotonic() >= self.disabled_until
+    
+    def record(self, success):
+        """Cookie denemesi sonucu - art arda hatalarda cookie yolu bir sure atlanir"""
+        with self.lock:
+            if success:
+                self.successes += 1
+                self.consecutive_failures = 0
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.disabled_until = time.monotonic() + self.cooldown
+                self.consecutive_failures = 0
+                logger.warning(f"Cookie'ler art arda basarisiz - {self.cooldown} sn boyunca direkt Android client kullanilacak")
+    
+    def summary(self):
+        with self.lock:
+            total = self.successes + self.failures
+            rate = self.successes / total * 100 if total else 0
+            return f"{self.successes} basarili, {self.failures} basarisiz (%{rate:.0f})"
+    
+    def cleanup(self):
+        self.jar = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+class YouTubeDownloader:
+    def __init__(self, startup=True):
+        """startup=False - stats / cleanup gibi komutlar icin dizin, cookie, veritabani ve banner adimlari atlanir"""
         self.download_dir = os.getenv("DOWNLOAD_DIR", "./downloads")
         self.channels = self.get_channels_to_monitor()
         self.max_videos = int(os.getenv("MAX_VIDEOS", "5"))
         self.quality = os.getenv("VIDEO_QUALITY", "best[height<=720]")
         
+        # Format planlayici - yt-dlp'nin VIDEO_QUALITY secimi temel alinir, sadece ayni kalitede daha ucuz
+        # (birlesik / direkt HTTP) format ile degistirilir. Yukseklik disinda filtre iceren secicilere dokunulmaz.
+        # FORMAT_PROGRESSIVE_MIN_HEIGHT > 0 ise bu yukseklikteki birlesik format merge'e tercih edilir
+        self.format_planner = os.getenv("FORMAT_PLANNER", "1") == "1"
+        height_limit = re.search(r"height\s*<=\s*(\d+)", self.quality)
+        self.format_max_height = int(height_limit.group(1)) if height_limit else 0
+        selector = re.sub(r"\[height\s*<=\s*\d+\]", "", self.quality.replace(" ", ""))
+        self.format_overridable = all(part in FORMAT_BEST_TOKENS for part in re.split(r"[+/]", selector))
+        self.format_progressive_min_height = int(os.getenv("FORMAT_PROGRESSIVE_MIN_HEIGHT", "0"))
+        self.merge_started = {}
+        self.merge_seconds = {}
+        
+        # Feed tarama ayarlari - paralel istek, host basina limit ve global hiz butcesi
+        self.feed_base_url = os.getenv("FEED_BASE_URL", "https://www.youtube.com/feeds/videos.xml")
+        self.feed_workers = int(os.getenv("FEED_WORKERS", "16"))
+        self.feed_per_host = int(os.getenv("FEED_PER_HOST", "8"))
+        self.feed_rate = TokenBucket(float(os.getenv("FEED_RATE", "20")))
+        self.host_slots = {}
+        self.host_slots_lock = threading.Lock()
+        self.feed_max_bytes = int(os.getenv("FEED_MAX_BYTES", str(5 * 1024 * 1024)))
+        self.feed_drain_bytes = int(os.getenv("FEED_DRAIN_BYTES", str(256 * 1024)))
+        self.http_session = None
+        
+        # Indirme havuzu - worker sayisi, worker basina ve global bant genisligi (byte/sn, 0 = limitsiz)
+        self.download_workers = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+        self.download_rate_limit = int(os.getenv("DOWNLOAD_RATE_LIMIT", "0"))
+        self.download_bucket = TokenBucket(int(os.getenv("DOWNLOAD_GLOBAL_RATE_LIMIT", "0")))
+        self.info_delay = float(os.getenv("INFO_DELAY", "2"))
+        self.download_cooldown = float(os.getenv("DOWNLOAD_COOLDOWN", "15"))
+        
+        # Daemon modu - kanal basina yukleme gecmisinden ogrenilen tarama araligi (sn)
+        self.daemon_default_interval = float(os.getenv("DAEMON_DEFAULT_INTERVAL", "900"))
+        self.daemon_min_interval = float(os.getenv("DAEMON_MIN_INTERVAL", "300"))
+        self.daemon_max_interval = float(os.getenv("DAEMON_MAX_INTERVAL", "21600"))
+        self.daemon_poll_factor = float(os.getenv("DAEMON_POLL_FACTOR", "0.1"))
+        self.upload_history = {}
+        self.upload_history_size = int(os.getenv("UPLOAD_HISTORY_SIZE", "20"))
+        self.stop_event = threading.Event()
+        
+        # Metrikler ve profil - METRICS_PORT=0 endpoint'i kapatir, PROFILE_DIR bir taramanin cProfile ciktisi
+        self.metrics_port = int(os.getenv("METRICS_PORT", "10000"))
+        self.metrics_server = None
+        self.profile_dir = os.getenv("PROFILE_DIR", "")
+        
+        # Saklama politikasi - toplam ve kanal basina byte limiti (0 = limitsiz)
+        self.retention_max_bytes = int(os.getenv("RETENTION_MAX_BYTES", "0"))
+        self.retention_channel_quota = int(os.getenv("RETENTION_CHANNEL_QUOTA_BYTES", "0"))
+        self.cleanup_workers = int(os.getenv("CLEANUP_WORKERS", "16"))
+        
+        # Disk alani kontrolu - DISK_MIN_FREE_BYTES bos kalir, yer yoksa DISK_WAIT_TIMEOUT sn beklenir
+        # DISK_AUTO_CLEANUP=1 ise once en eski videolar silinir, DOWNLOAD_PREALLOCATE=1 aria2c ile yer ayirir
+        self.disk_default_estimate = int(os.getenv("DISK_DEFAULT_ESTIMATE_BYTES", str(500 * 1024 * 1024)))
+        self.disk_admission = DiskAdmission(
+            self.download_dir,
+            min_free=int(os.getenv("DISK_MIN_FREE_BYTES", str(1024 * 1024 * 1024))),
+            wait_timeout=float(os.getenv("DISK_WAIT_TIMEOUT", "600")),
+            on_shortage=self.free_disk_space if os.getenv("DISK_AUTO_CLEANUP", "0") == "1" else None
+        )
+        self.download_preallocate = os.getenv("DOWNLOAD_PREALLOCATE", "0") == "1"
+        if self.download_preallocate and not shutil.which("aria2c"):
+            logger.warning("DOWNLOAD_PREALLOCATE icin aria2c bulunamadi - on ayirma kapali")
+            self.download_preallocate = False
+        
+        # ffmpeg son islem - POSTPROCESS_STEPS=remux,thumbnail,loudnorm (bos = kapali), CPU sayisi kadar process
+        self.postprocess = self.create_postprocess_pipeline()
+        
+        # Thread basina, profil basina tekrar kullanilan YoutubeDL instance'lari
+        self.ydl_local = threading.local()
+        
+        # Feed cache - ETag / Last-Modified / icerik hash'i, degismeyen feed parse edilmez
+        self.feed_cache_file = os.getenv("FEED_CACHE_FILE", "feed_cache.json")
+        self.feed_cache = self.load_feed_cache()
+        self.feed_cache_lock = threading.Lock()
+        self.feed_cache_stats = {"not_modified": 0, "unchanged": 0, "miss": 0}
+        
         # Manuel YouTube cookies - Bot korumasını aşar!
-        self.youtube_cookies = os.getenv("YOUTUBE_COOKIES", "")
+        # YOUTUBE_COOKIES (JSON) veya YOUTUBE_COOKIES_FILE - jar bir kere yazilir, degisince yenilenir
+        self.cookies = CookieManager(
+            os.getenv("COOKIE_JAR_FILE") or None,
+            failure_threshold=int(os.getenv("COOKIE_FAILURE_THRESHOLD", "3")),
+            cooldown=float(os.getenv("COOKIE_COOLDOWN", "600"))
+        )
+        cookies_active = bool(self.cookies.refresh()) if startup else False
+        
+        if startup:
+            Path(self.download_dir).mkdir(parents=True, exist_ok=True)
+        self.stats_log = StatsLog(
+            os.getenv("STATS_FILE", "download_stats.jsonl"),
+            max_bytes=int(os.getenv("STATS_MAX_BYTES", str(10 * 1024 * 1024))),
+            max_age=float(os.getenv("STATS_MAX_AGE", str(7 * 24 * 3600)))
+        )
+        # Veritabani ve kalici durum - open_storage ile acilir (stats gibi salt okunur komutlar acmaz)
+        self.db_file = os.getenv("DB_FILE", "downloaded_videos.db")
+        self.channel_page_max_bytes = int(os.getenv("CHANNEL_PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+        # RSS basarisizsa yt-dlp ile artimli listeleme - BROWSER_COOKIES bos ise tarayici stratejisi kapali
+        self.browser = os.getenv("BROWSER_COOKIES", "chrome").strip().lower()
+        self.browser_cookies = None
+        self.backfill_batch = int(os.getenv("BACKFILL_BATCH", "200"))
+        self.node_id = os.getenv("NODE_ID", f"{socket.gethostname()}-{os.getpid()}")
+        self.sidecar_max_bytes = int(os.getenv("SIDECAR_MAX_BYTES", str(5 * 1024 * 1024)))
+        self.video_store = None
+        self.cluster = None
+        self.sidecars = None
         
-        Path(self.download_dir).mkdir(parents=True, exist_ok=True)
-        self.stats_file = "download_stats.json"
+        if not startup:
+            return
+        self.open_storage()
         
         logger.info("YouTube Downloader baslatildi")
         logger.info(f"Indirme klasoru: {self.download_dir}")
         logger.info(f"Monitor edilecek kanallar: {len(self.channels)}")
-        logger.info(f"Manuel cookies: {'AKTIF' if self.youtube_cookies else 'YOK'}")
+        logger.info(f"Manuel cookies: {'AKTIF' if cookies_active else 'YOK'}")
         
         print("YouTube Downloader hazir!")
         print(f"Indirme klasoru: {self.download_dir}")
         print(f"Takip edilen kanal sayisi: {len(self.channels)}")
-        print(f"Cookie durumu: {'✅ AKTIF' if self.youtube_cookies else '❌ YOK'}")
+        print(f"Cookie durumu: {'✅ AKTIF' if cookies_active else '❌ YOK'}")
+    
+    def open_storage(self):
+        """Veritabani, journal, kilitler ve bir kere calisan aktarimlar (eski JSON dosyalari, dizin indeksi)"""
+        try:
+            migrated = self.stats_log.migrate_json("download_stats.json")
+            if migrated:
+                logger.info(f"download_stats.json istatistik loguna aktarildi: {migrated} kayit")
+        except Exception as e:
+            logger.error(f"download_stats.json aktarilamadi: {e}")
+        
+        # Indirilen videolar veritabani - eski JSON dosyasi varsa bir kere aktarilir
+        self.video_store = VideoStore(self.db_file)
+        
+        # @handle / /c/ URL -> channel ID - bir kere cozulur, sonraki taramalar RSS yolunu kullanir
+        self.channel_resolver = ChannelResolver(
+            self.db_file,
+            ttl=float(os.getenv("CHANNEL_ID_TTL", str(30 * 24 * 3600))),
+            negative_ttl=float(os.getenv("CHANNEL_ID_NEGATIVE_TTL", "3600"))
+        )
+        
+        # RSS basarisizsa yt-dlp ile artimli listeleme - kanal basina en yeni video ve geriye donuk konum
+        self.channel_cursors = ChannelCursors(self.db_file)
+        self.format_cache = FormatCache(self.db_file)
+        
+        # Cluster modu - DB_FILE paylasilan volume'de, kanallar node'lar arasinda bolunur
+        if os.getenv("CLUSTER_MODE", "0") == "1":
+            self.cluster = ClusterCoordinator(
+                self.db_file,
+                self.node_id,
+                lease_ttl=float(os.getenv("CLUSTER_LEASE_TTL", "60")),
+                heartbeat_interval=float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", "15"))
+            )
+        
+        # Altyazi ve metadata ayri asamada - SIDECARS=0 kapatir, SIDECAR_DISABLED_CHANNELS kanal URL / ID listesi
+        if os.getenv("SIDECARS", "1") == "1":
+            self.sidecars = SidecarStage(
+                SidecarStore(self.db_file),
+                self.fetch_sidecar,
+                [language.strip() for language in os.getenv("SUBTITLE_LANGS", "tr,en").split(",") if language.strip()],
+                workers=int(os.getenv("SIDECAR_WORKERS", "4")),
+                disabled_channels=[channel.strip() for channel in os.getenv("SIDECAR_DISABLED_CHANNELS", "").split(",") if channel.strip()]
+            )
+        
+        # Ayni video iki kanalda / iki process'te bulunursa bir kere islenir
+        self.video_flight = SingleFlight()
+        # Kilit sahibi process basina tekil - ayni NODE_ID ile calisan download komutu daemon'un kilidini alamaz
+        self.video_locks = VideoLocks(
+            self.db_file, f"{self.node_id}:{os.getpid()}:{uuid.uuid4().hex}", ttl=float(os.getenv("VIDEO_LOCK_TTL", "600"))
+        )
+        
+        self.journal = JobJournal(
+            self.db_file,
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+            retry_base=float(os.getenv("JOB_RETRY_BASE", "60")),
+            node_id=self.node_id
+        )
+        try:
+            migrated = self.video_store.migrate_json("downloaded_videos.json")
+            if migrated:
+                logger.info(f"downloaded_videos.json veritabanina aktarildi: {migrated} video")
+        except Exception as e:
+            logger.error(f"downloaded_videos.json aktarilamadi: {e}")
+        try:
+            indexed = self.video_store.index_files(self.download_dir)
+            if indexed:
+                logger.info(f"Eski indirmeler saklama politikasina eklendi: {indexed} dosya")
+        except Exception as e:
+            logger.error(f"Eski indirmeler indekslenemedi: {e}")
+    
+    def create_postprocess_pipeline(self):
+        steps = [step.strip() for step in os.getenv("POSTPROCESS_STEPS", "").split(",") if step.strip()]
+        unknown = [step for step in steps if step not in POSTPROCESS_STEPS]
+        if unknown:
+            logger.warning(f"Bilinmeyen son islem adimlari atlandi: {', '.join(unknown)}")
+            steps = [step for step in steps if step in POSTPROCESS_STEPS]
+        if not steps:
+            return None
+        if not shutil.which("ffmpeg"):
+            logger.warning("ffmpeg bulunamadi, son islem kapali")
+            return None
+        timeout = float(os.getenv("POSTPROCESS_TIMEOUT", "3600"))
+        return PostProcessPipeline(
+            steps,
+            os.getenv("POSTPROCESS_DIR", os.path.join(self.download_dir, "processed")),
+            workers=int(os.getenv("POSTPROCESS_WORKERS", "0")) or None,
+            timeout=timeout if timeout > 0 else None,
+            on_complete=self.on_postprocess_complete
+        )
+    
+    def on_postprocess_complete(self, video_id, ok):
+        """Is tum son islem adimlari bitince 'done' - hata / iptalde sonraki baslangicta tekrar denenir"""
+        if ok:
+            self.journal.set_state(video_id, "done")
+    
+    def resume_postprocess(self):
+        """Onceki calismada bitmeyen son islemler - ciktisi eksik olan kayitli videolar tekrar kuyruga
+        
+        Son islem kapaliysa (POSTPROCESS_STEPS bos) bekleyen isler kapatilir.
+        """
+        live_nodes = self.cluster.live_nodes() if self.cluster else None
+        resumed = 0
+        for video_id in self.journal.in_state("pipeline_pending", live_nodes):
+            if not self.postprocess:
+                self.journal.set_state(video_id, "done")
+                continue
+            file_path = self.video_store.get_file_path(video_id)
+            missing = [path for path in self.postprocess.outputs(video_id) if not os.path.exists(path)]
+            if not missing or not file_path or not os.path.exists(file_path):
+                self.journal.set_state(video_id, "done")
+                continue
+            self.postprocess.submit(video_id, file_path)
+            resumed += 1
+        if resumed:
+            logger.info(f"Yarim kalan son islemler tekrar kuyrukta: {resumed} video")
     
     def get_channels_to_monitor(self):
         channels = []
@@ -57,39 +1983,50 @@ class YouTubeDownloader:
         
         return channels
     
-    def save_download_stats(self, video_info):
+    def save_download_stats(self, video_info, file_path=None, download_seconds=0):
         try:
-            stats = self.load_download_stats()
+            file_size = 0
+            if isinstance(file_path, str) and os.path.exists(file_path):
+                file_size = os.path.getsize(file_path)
             
-            new_entry = {
+            self.stats_log.append({
                 "timestamp": datetime.now().isoformat(),
+                "video_id": video_info.get("id"),
                 "title": video_info.get("title", "Bilinmeyen"),
                 "uploader": video_info.get("uploader", "Bilinmeyen"),
+                "channel": video_info.get("channel_url") or video_info.get("uploader"),
                 "duration": video_info.get("duration", 0),
                 "view_count": video_info.get("view_count", 0),
-                "url": video_info.get("webpage_url", "")
-            }
-            
-            stats.append(new_entry)
+                "url": video_info.get("webpage_url", ""),
+                "bytes": file_size,
+                "download_seconds": round(download_seconds, 3),
+                "format": video_info.get("_format_id") or video_info.get("format_id"),
+                "merge_seconds": round(video_info["_merge_seconds"], 3) if video_info.get("_merge_seconds") else 0
+            })
             
-            if len(stats) > 100:
-                stats = stats[-100:]
-            
-            with open(self.stats_file, "w", encoding="utf-8") as f:
-                json.dump(stats, f, ensure_ascii=False, indent=2)
-                
         except Exception as e:
             logger.error(f"Istatistik kaydetme hatasi: {e}")
     
-    def load_download_stats(self):
+    def summarize_download_stats(self, last=5):
+        """Istatistik logunu akis halinde oku - kanal bazli sayi, byte, sure ve hiz"""
+        total = 0
+        channels = {}
+        recent = deque(maxlen=last)
+        
         try:
-            if os.path.exists(self.stats_file):
-                with open(self.stats_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            return []
+            for entry in self.stats_log:
+                total += 1
+                recent.append(entry)
+                channel = entry.get("channel") or entry.get("uploader") or "Bilinmeyen"
+                summary = channels.setdefault(channel, {"count": 0, "bytes": 0, "duration": 0, "download_seconds": 0})
+                summary["count"] += 1
+                summary["bytes"] += entry.get("bytes") or 0
+                summary["duration"] += entry.get("duration") or 0
+                summary["download_seconds"] += entry.get("download_seconds") or 0
         except Exception as e:
             logger.error(f"Istatistik yukleme hatasi: {e}")
-            return []
+        
+        return {"total": total, "channels": channels, "recent": list(recent)}
     
     def print_success_notification(self, video_info):
         title = video_info.get("title", "Bilinmeyen Video")
@@ -104,312 +2041,839 @@ class YouTubeDownloader:
         print(f"Indirilme Zamani: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("="*60 + "\n")
     
-    def create_cookie_jar(self):
-        """Manuel cookie'lerden cookie jar oluştur"""
-        if not self.youtube_cookies:
-            return None
-            
-        try:
-            import tempfile
-            import http.cookiejar
-            
-            # Cookie jar oluştur
-            cookie_jar = http.cookiejar.MozillaCookieJar()
-            
-            # JSON parse et
-            cookies_dict = json.loads(self.youtube_cookies)
-            
-            # Her cookie için entry oluştur
-            for name, value in cookies_dict.items():
-                cookie_jar.set_cookie(http.cookiejar.Cookie(
-                    version=0, name=name, value=value,
-                    port=None, port_specified=False,
-                    domain='.youtube.com', domain_specified=True, domain_initial_dot=True,
-                    path='/', path_specified=True,
-                    secure=True, expires=None, discard=True, comment=None,
-                    comment_url=None, rest={}
-                ))
-            
-            # Temporary file'a kaydet
-            cookie_file = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
-            cookie_jar.save(cookie_file.name)
-            cookie_file.close()
-            
-            logger.info(f"Cookie jar olusturuldu: {len(cookies_dict)} cookie")
-            return cookie_file.name
-            
-        except Exception as e:
-            logger.error(f"Cookie jar olusturma hatasi: {e}")
-            return None
-    def get_video_info(self, url):
-        # Önce manuel cookie'ler ile dene
-        if self.youtube_cookies:
-            logger.info("Manuel cookie'ler ile video bilgisi aliniyor...")
-            cookie_file = self.create_cookie_jar()
-            if cookie_file:
-                ydl_opts = {
-                    "quiet": True,
-                    "no_warnings": True,
-                    "cookiefile": cookie_file,
-                    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                }
-                
-                try:
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(url, download=False)
-                        logger.info("Manuel cookie'ler ile video bilgisi BASARILI!")
-                        # Cookie file'ı temizle
-                        try:
-                            os.unlink(cookie_file)
-                        except:
-                            pass
-                        return info
-                except Exception as e:
-                    logger.warning(f"Manuel cookie'ler basarisiz: {e}")
-                    # Cookie file'ı temizle
-                    try:
-                        os.unlink(cookie_file)
-                    except:
-                        pass
+    def make_bandwidth_hook(self):
+        """Global bant genisligi limiti - indirilen byte kadar token harca"""
+        seen = {}
         
-        # Fallback: Android client
-        logger.info("Fallback: Android client deneniyor...")
-        ydl_opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "user_agent": "com.google.android.youtube/17.36.4 (Linux; U; Android 12; TR) gzip",
-            "extractor_args": {
-                "youtube": {
-                    "player_client": ["android"],
-                    "player_skip": ["webpage", "configs"]
-                }
-            }
-        }
+        def hook(progress):
+            key = progress.get("tmpfilename") or progress.get("filename")
+            if progress.get("status") != "downloading":
+                seen.pop(key, None)
+                return
+            done = progress.get("downloaded_bytes") or 0
+            delta = done - seen.get(key, 0)
+            seen[key] = done
+            if delta > 0:
+                self.download_bucket.acquire(delta)
         
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return info
-        except Exception as e:
-            logger.error(f"Video bilgisi alinamadi {url}: {e}")
-            return None
+        return hook
     
+    def get_download_limits(self):
+        opts = {"progress_hooks": [self.on_download_progress]}
+        if self.download_rate_limit > 0:
+            opts["ratelimit"] = self.download_rate_limit
+        if self.download_bucket.rate > 0:
+            opts["progress_hooks"].append(self.make_bandwidth_hook())
+        if self.download_preallocate:
+            # Buyuk dosyalar tek seferde ayrilir - parca parca buyuyen dosyada parcalanma azalir
+            opts["external_downloader"] = {"http": "aria2c"}
+            opts["external_downloader_args"] = {"aria2c": ["--file-allocation=falloc", "--max-connection-per-server=1"]}
+        return opts
     
-    def download_video(self, url, video_info=None):
-        logger.info(f"Video indiriliyor: {url}")
+    def on_download_progress(self, progress):
+        """Yazilan byte rezervasyondan dusulur - ayni video icin video ve ses dosyalari ayri sayilir
         
-        os.makedirs(self.download_dir, exist_ok=True)
+        Hook indirmeyi yapan thread'de cagrilir, rezervasyon anahtari o thread'in o anki isidir
+        (video bilgisi yokken URL ile ayrilan yer de boylece dusulur).
+        """
+        job = getattr(self.ydl_local, "disk_job", None) or (progress.get("info_dict") or {}).get("id")
+        if job and progress.get("downloaded_bytes"):
+            key = progress.get("tmpfilename") or progress.get("filename")
+            self.disk_admission.progress(job, key, progress["downloaded_bytes"])
+    
+    def plan_format(self, video_info):
+        """yt-dlp'nin secimi ve olasi daha ucuz esdegeri - (format, tur, yukseklik) veya planlanamazsa None
         
-        # Önce manuel cookie'ler ile dene
-        if self.youtube_cookies:
-            logger.info("Manuel cookie'ler ile video indiriliyor...")
-            cookie_file = self.create_cookie_jar()
-            if cookie_file:
-                ydl_opts = {
-                    "format": self.quality,
-                    "outtmpl": os.path.join(self.download_dir, "%(uploader)s - %(title)s.%(ext)s"),
-                    "restrictfilenames": True,
-                    "noplaylist": True,
-                    "writeinfojson": True,
-                    "writesubtitles": True,
-                    "writeautomaticsub": True,
-                    "subtitleslangs": ["tr", "en"],
-                    "cookiefile": cookie_file,
-                    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                }
-                
-                try:
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        ydl.download([url])
-                    
-                    logger.info(f"Manuel cookie'ler ile video BASARILI: {url}")
-                    
-                    if video_info:
-                        self.print_success_notification(video_info)
-                        self.save_download_stats(video_info)
-                    
-                    # Cookie file'ı temizle
-                    try:
-                        os.unlink(cookie_file)
-                    except:
-                        pass
-                    return True
-                    
-                except Exception as e:
-                    logger.warning(f"Manuel cookie'ler ile indirme basarisiz: {e}")
-                    # Cookie file'ı temizle
-                    try:
-                        os.unlink(cookie_file)
-                    except:
-                        pass
+        Temel secim get_video_info'nun VIDEO_QUALITY ile yaptigi secimdir. Tek dosyalik secim asla
+        merge'e cevrilmez; merge secimi, ayni yukseklige (veya FORMAT_PROGRESSIVE_MIN_HEIGHT'e) ulasan
+        birlesik format varsa onunla degistirilir. Kanalin onceki secimi uygunsa once o denenir.
+        """
+        video_info = video_info or {}
+        if not self.format_planner or not video_info.get("format_id"):
+            return None
+        
+        def height(f):
+            return f.get("height") or 0
+        
+        def has(f, codec):
+            return f.get(codec) not in (None, "none")
         
-        # Fallback: Android client
-        logger.info("Fallback: Android client ile indirme deneniyor...")
+        def direct(f):
+            return f.get("protocol") in ("https", "http")
+        
+        requested = video_info.get("requested_formats") or []
+        kind = "merge" if len(requested) > 1 else "progressive"
+        base_height = max(height(f) for f in requested or [video_info])
+        baseline = (video_info["format_id"], kind, base_height)
+        if not self.format_overridable:
+            return baseline
+        
+        # Merge yerine birlesik format: en az temel yukseklik (kullanici izin verdiyse daha dusuk)
+        needed = base_height
+        if kind == "merge" and self.format_progressive_min_height:
+            needed = min(needed, self.format_progressive_min_height)
+        candidates = [
+            f for f in video_info.get("formats") or []
+            if f.get("format_id") and has(f, "vcodec") and has(f, "acodec") and direct(f)
+            and height(f) >= needed and (not self.format_max_height or height(f) <= self.format_max_height)
+        ]
+        # Tek dosyalik secim zaten direkt ise degistirmenin kazanci yok
+        if kind == "progressive" and direct(video_info):
+            candidates = []
+        if not candidates:
+            return baseline
+        
+        channel = video_info.get("channel_id") or video_info.get("channel_url")
+        cached = self.format_cache.get(channel) if channel else None
+        if cached and cached["kind"] == "progressive":
+            for f in candidates:
+                if f["format_id"] == cached["format_id"]:
+                    return f["format_id"], "progressive", height(f)
+        best = max(candidates, key=lambda f: (height(f), f.get("tbr") or 0))
+        return best["format_id"], "progressive", height(best)
+    
+    def record_format(self, video_info, result):
+        """Secilen format ve birlestirme suresi - istatistik loguna ve kanal format kaydina"""
+        video_info["_format_id"] = (result or {}).get("format_id") or video_info.get("_format_id")
+        video_info["_merge_seconds"] = self.merge_seconds.pop(video_info.get("id"), None)
+        channel = video_info.get("channel_id") or video_info.get("channel_url")
+        if not channel or not video_info.get("_format_kind"):
+            return
+        try:
+            self.format_cache.record(
+                channel, video_info["_format_id"], video_info["_format_kind"],
+                video_info.get("_format_height"), video_info["_merge_seconds"]
+            )
+        except Exception as e:
+            logger.error(f"Format kaydi yazilamadi: {e}")
+    
+    @contextmanager
+    def selected_format(self, ydl, format_id):
+        """Thread'e ait YoutubeDL'de bu video icin format secicisini degistir, sonra geri al"""
+        if not format_id:
+            yield
+            return
+        previous = ydl.format_selector
+        ydl.format_selector = ydl.build_format_selector(format_id)
+        try:
+            yield
+        finally:
+            ydl.format_selector = previous
+    
+    def estimate_download_size(self, video_info):
+        """filesize / filesize_approx'tan tahmini disk ihtiyaci - birlestirilen formatlarda gecici iki kat"""
+        if not video_info:
+            return self.disk_default_estimate
+        formats = video_info.get("requested_formats") or [video_info]
+        if video_info.get("_format_id"):
+            by_id = {f.get("format_id"): f for f in video_info.get("formats") or []}
+            planned = [by_id.get(format_id) for format_id in video_info["_format_id"].split("+")]
+            if all(planned):
+                formats = planned
+        size = 0
+        for fmt in formats:
+            fmt_size = fmt.get("filesize") or fmt.get("filesize_approx")
+            if not fmt_size and fmt.get("tbr") and video_info.get("duration"):
+                fmt_size = fmt["tbr"] * 1000 / 8 * video_info["duration"]
+            if not fmt_size:
+                return self.disk_default_estimate
+            size += fmt_size
+        # ffmpeg birlestirirken parcalar ve cikti ayni anda diskte
+        if len(formats) > 1:
+            size *= 2
+        return int(size * 1.05)
+    
+    def free_disk_space(self, shortage):
+        """Yer yetersizse en eski videolari sil - saklanan toplam eksik kadar azaltilir"""
+        stored = self.video_store.stored_bytes()
+        if stored <= 0:
+            return 0
+        logger.warning(f"Disk alani yetersiz - {shortage / 1e6:.0f} MB icin eski videolar siliniyor")
+        return self.apply_retention(max_bytes=max(1, stored - shortage))
+    
+    def on_postprocess(self, progress):
+        video_id = (progress.get("info_dict") or {}).get("id")
+        if not video_id:
+            return
+        if progress.get("status") == "started":
+            self.journal.set_state(video_id, "postprocessing")
+        # ffmpeg birlestirme maliyeti - format planlayicisinin kanal kaydina yazilir
+        if progress.get("postprocessor") == "Merger":
+            if progress.get("status") == "started":
+                self.merge_started[video_id] = time.monotonic()
+            elif progress.get("status") == "finished" and video_id in self.merge_started:
+                self.merge_seconds[video_id] = time.monotonic() - self.merge_started.pop(video_id)
+                metrics.observe("merge_seconds", self.merge_seconds[video_id])
+    
+    def get_ydl_profiles(self):
+        """Denenecek yt-dlp profilleri - once manuel cookie, sonra android"""
+        if self.cookies.available():
+            return ["cookie", "android"]
+        return ["android"]
+    
+    def get_ydl_options(self, profile):
         ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
             "format": self.quality,
             "outtmpl": os.path.join(self.download_dir, "%(uploader)s - %(title)s.%(ext)s"),
             "restrictfilenames": True,
             "noplaylist": True,
-            "writeinfojson": True,
-            "writesubtitles": True,
-            "writeautomaticsub": True,
-            "subtitleslangs": ["tr", "en"],
-            "user_agent": "com.google.android.youtube/17.36.4 (Linux; U; Android 12; TR) gzip",
-            "extractor_args": {
+            # Yarim kalan .part / fragment indirmeleri kaldigi yerden devam eder
+            "continuedl": True,
+            "nopart": False,
+            "postprocessor_hooks": [self.on_postprocess],
+            **self.get_download_limits()
+        }
+        if profile == "cookie":
+            ydl_opts["user_agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        else:
+            ydl_opts["user_agent"] = "com.google.android.youtube/17.36.4 (Linux; U; Android 12; TR) gzip"
+            ydl_opts["extractor_args"] = {
                 "youtube": {
                     "player_client": ["android"],
                     "player_skip": ["webpage", "configs"]
                 }
             }
-        }
+        return ydl_opts
+    
+    def get_ydl(self, profile):
+        """Profil basina YoutubeDL - her worker thread'i kendi instance'ini tekrar kullanir"""
+        instances = getattr(self.ydl_local, "instances", None)
+        if instances is None:
+            instances = self.ydl_local.instances = {}
         
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+        ydl_opts = self.get_ydl_options(profile)
+        key = profile
+        if profile == "cookie":
+            cookie_jar = self.cookies.refresh()
+            if not cookie_jar:
+                return None
+            # Cookie kaynagi degisince yeni instance
+            key = f"cookie:{self.cookies.version}"
+        if key in instances:
+            return instances[key]
+        
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(ydl_opts)
+        if profile == "cookie":
+            # Cookie'ler bellekten kopyalanir - cookiefile yok, kapanista hicbir dosya yazilmaz
+            for cookie in cookie_jar:
+                ydl.cookiejar.set_cookie(cookie)
+            for old_key in [k for k in instances if k.startswith("cookie:")]:
+                del instances[old_key]
+        
+        instances[key] = ydl
+        return ydl
+    
+    def get_video_info(self, url):
+        for profile in self.get_ydl_profiles():
+            if profile == "cookie":
+                logger.info("Manuel cookie'ler ile video bilgisi aliniyor...")
+            else:
+                logger.info("Fallback: Android client deneniyor...")
             
-            logger.info(f"Android client ile video indirildi: {url}")
+            ydl = self.get_ydl(profile)
+            if ydl is None:
+                continue
             
-            if video_info:
-                self.print_success_notification(video_info)
-                self.save_download_stats(video_info)
+            try:
+                started = time.monotonic()
+                info = ydl.extract_info(url, download=False)
+                # Indirme asamasi ayni bilgiyi tekrar kullanir
+                info["_ydl_profile"] = profile
+                info["_extract_seconds"] = time.monotonic() - started
+                metrics.observe("extract_info_seconds", info["_extract_seconds"], profile=profile)
+                metrics.inc("ydl_attempts_total", stage="info", profile=profile, result="ok")
+                if profile == "cookie":
+                    self.cookies.record(True)
+                    logger.info("Manuel cookie'ler ile video bilgisi BASARILI!")
+                return info
+            except Exception as e:
+                metrics.inc("ydl_attempts_total", stage="info", profile=profile, result="fail")
+                if profile == "cookie":
+                    self.cookies.record(False)
+                    logger.warning(f"Manuel cookie'ler basarisiz: {e}")
+                else:
+                    logger.error(f"Video bilgisi alinamadi {url}: {e}")
+        
+        return None
+    
+    def get_downloaded_path(self, result):
+        """process_ie_result sonucundan son dosya yolunu al (post-processing sonrasi)"""
+        for download in (result or {}).get("requested_downloads") or []:
+            if download.get("filepath"):
+                return download["filepath"]
+        return None
+    
+    def get_sidecar_paths(self, result):
+        """Videoyla birlikte yazilan info.json, altyazi ve kucuk resim dosyalari"""
+        paths = []
+        for download in (result or {}).get("requested_downloads") or []:
+            paths.append(download.get("infojson_filename"))
+            paths.extend(sub.get("filepath") for sub in (download.get("requested_subtitles") or {}).values())
+            paths.extend(thumb.get("filepath") for thumb in download.get("thumbnails") or [])
+        return sorted({path for path in paths if path})
+    
+    def download_video(self, url, video_info=None):
+        logger.info(f"Video indiriliyor: {url}")
+        
+        os.makedirs(self.download_dir, exist_ok=True)
+        
+        plan = self.plan_format(video_info)
+        if plan:
+            video_info["_format_id"], video_info["_format_kind"], video_info["_format_height"] = plan
+            logger.info(f"Format secildi: {plan[0]} ({plan[1]}, {plan[2]}p)")
+        metrics.inc("format_choice_total", kind=plan[1] if plan else "static")
+        
+        # Tahmini boyut kadar yer ayrilamazsa indirme baslamaz - is journal'da tekrar denenir
+        job = (video_info or {}).get("id") or url
+        size = self.estimate_download_size(video_info)
+        with self.disk_admission.admit(job, size) as admitted:
+            metrics.inc("disk_admission_total", result="admitted" if admitted else "rejected")
+            if not admitted:
+                logger.error(f"Disk alani yetersiz, indirme ertelendi: {url} ({size / 1e6:.0f} MB gerekli)")
+                return False
+            self.ydl_local.disk_job = job
+            try:
+                return self.download_admitted_video(url, video_info)
+            finally:
+                self.ydl_local.disk_job = None
+    
+    def download_admitted_video(self, url, video_info=None):
+        for profile in self.get_ydl_profiles():
+            if profile == "cookie":
+                logger.info("Manuel cookie'ler ile video indiriliyor...")
+            else:
+                logger.info("Fallback: Android client ile indirme deneniyor...")
             
-            return True
+            ydl = self.get_ydl(profile)
+            if ydl is None:
+                continue
             
+            try:
+                started = time.monotonic()
+                if video_info and video_info.get("_ydl_profile") == profile:
+                    # Tek gecis - get_video_info sonucunu tekrar extract etmeden indir
+                    info = ydl.sanitize_info(video_info, remove_private_keys=True)
+                    with self.selected_format(ydl, video_info.get("_format_id")):
+                        result = ydl.process_ie_result(info, download=True)
+                    logger.info(f"Video bilgisi tekrar kullanildi - {video_info.get('_extract_seconds', 0):.1f} sn extract tasarrufu")
+                else:
+                    result = ydl.extract_info(url, download=True)
+                    if video_info is not None:
+                        # Plan bu profilin format listesine ait degil - statik secici kullanildi
+                        video_info.pop("_format_kind", None)
+                
+                if profile == "cookie":
+                    self.cookies.record(True)
+                    logger.info(f"Manuel cookie'ler ile video BASARILI: {url}")
+                else:
+                    logger.info(f"Android client ile video indirildi: {url}")
+                
+                file_path = self.get_downloaded_path(result)
+                if video_info is not None:
+                    # Saklama politikasi video ve yan dosyalari birlikte siler
+                    video_info["_sidecars"] = self.get_sidecar_paths(result)
+                    self.record_format(video_info, result)
+                elapsed = time.monotonic() - started
+                metrics.inc("ydl_attempts_total", stage="download", profile=profile, result="ok")
+                metrics.observe("download_seconds", elapsed)
+                if file_path and os.path.exists(file_path):
+                    file_size = os.path.getsize(file_path)
+                    metrics.inc("download_bytes_total", file_size)
+                    if elapsed > 0:
+                        metrics.observe("download_speed_bytes", file_size / elapsed)
+                
+                if video_info:
+                    self.print_success_notification(video_info)
+                    self.save_download_stats(video_info, file_path, elapsed)
+                
+                return file_path or True
+                
+            except Exception as e:
+                metrics.inc("ydl_attempts_total", stage="download", profile=profile, result="fail")
+                if profile == "cookie":
+                    self.cookies.record(False)
+                    logger.warning(f"Manuel cookie'ler ile indirme basarisiz: {e}")
+                else:
+                    logger.error(f"Video indirme hatasi {url}: {e}")
+        
+        return False
+    
+    @property
+    def http(self):
+        """Ortak HTTP session - requests ilk istekte yuklenir (stats / cleanup hic yuklemez)"""
+        if self.http_session is None:
+            with self.host_slots_lock:
+                if self.http_session is None:
+                    self.http_session = self.create_http_session()
+        return self.http_session
+    
+    def create_http_session(self):
+        """Tum feed istekleri icin ortak, keep-alive baglanti havuzlu session"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        session.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        
+        retry = Retry(
+            total=int(os.getenv("HTTP_RETRIES", "3")),
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        # Havuz boyutu eszamanli feed istek sayisi kadar - baglanti atilmadan tekrar kullanilir
+        adapter = HTTPAdapter(
+            pool_connections=int(os.getenv("HTTP_POOL_HOSTS", "4")),
+            pool_maxsize=max(self.feed_workers, self.feed_per_host),
+            pool_block=True,
+            max_retries=retry
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def get_http_stats(self):
+        """Baglanti havuzu istatistikleri - acilan baglanti ve yapilan istek sayisi"""
+        connections = 0
+        requests_made = 0
+        adapters = self.http_session.adapters.values() if self.http_session else []
+        for adapter in set(adapters):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                requests_made += pool.num_requests
+        reuse = (1 - connections / requests_made) * 100 if requests_made else 0
+        return {"connections": connections, "requests": requests_made, "reuse": reuse}
+    
+    def log_http_stats(self):
+        stats = self.get_http_stats()
+        logger.info(f"HTTP baglantilari: {stats['requests']} istek, {stats['connections']} yeni baglanti (%{stats['reuse']:.0f} tekrar kullanim)")
+    
+    def limit_stream(self, chunks):
+        """Cevap boyut limiti - FEED_MAX_BYTES asilirsa okumayi kes"""
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+            if total > self.feed_max_bytes:
+                raise ValueError(f"Cevap boyut limiti asildi ({self.feed_max_bytes} byte)")
+            yield chunk
+    
+    def drain_response(self, response, chunks):
+        """Erken durulan cevabin kalani kucukse oku - yoksa baglanti kapanir, havuza donmez"""
+        length = response.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) - response.raw.tell() > self.feed_drain_bytes:
+            return
+        drained = 0
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > self.feed_drain_bytes:
+                return
+    
+    def fetch_sidecar(self, url):
+        """Altyazi dosyasini ortak session ile al - SIDECAR_MAX_BYTES asilirsa birakilir"""
+        # Host limiti govde okunana kadar tutulur
+        with self.get_host_slot(url):
+            response = self.http.get(url, timeout=30, stream=True)
+            with response:
+                response.raise_for_status()
+                content = bytearray()
+                for chunk in response.iter_content(chunk_size=65536):
+                    content += chunk
+                    if len(content) > self.sidecar_max_bytes:
+                        raise ValueError(f"Altyazi boyut limiti asildi ({self.sidecar_max_bytes} byte)")
+        return bytes(content)
+    
+    def get_host_slot(self, url):
+        """Host basina eszamanli istek limiti icin semaphore"""
+        host = urlparse(url).netloc
+        with self.host_slots_lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.feed_per_host)
+            return self.host_slots[host]
+    
+    def load_feed_cache(self):
+        try:
+            if os.path.exists(self.feed_cache_file):
+                with open(self.feed_cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            return {}
         except Exception as e:
-            logger.error(f"Video indirme hatasi {url}: {e}")
-            return False
+            logger.error(f"Feed cache yuklenemedi: {e}")
+            return {}
+    
+    def save_feed_cache(self):
+        try:
+            with self.feed_cache_lock:
+                data = json.dumps(self.feed_cache, ensure_ascii=False)
+            # Once gecici dosyaya yaz, sonra atomik olarak degistir
+            tmp_file = f"{self.feed_cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_file, self.feed_cache_file)
+        except Exception as e:
+            logger.error(f"Feed cache kaydedilemedi: {e}")
+    
+    def count_feed_cache(self, key):
+        with self.feed_cache_lock:
+            self.feed_cache_stats[key] += 1
+        metrics.inc("feed_cache_total", result=key)
+    
+    def get_cached_feed(self, channel_id):
+        with self.feed_cache_lock:
+            cached = self.feed_cache.get(channel_id)
+        # max_videos degistiyse eski liste gecersiz
+        if cached and cached.get("max_videos") == self.max_videos:
+            return cached
+        return None
+    
+    def resolve_channel_id(self, channel_url):
+        """Kanal sayfasinin basindan channel ID'yi bul - bulununca okumayi birak"""
+        url = ChannelResolver.key(channel_url)
+        found = None
+        # Host limiti sayfa okunup baglanti kapanana kadar tutulur
+        with self.get_host_slot(url):
+            self.feed_rate.acquire()
+            # Consent cookie'si - AB'de consent sayfasina yonlendirilmeyi engeller
+            response = self.http.get(url, timeout=10, stream=True, cookies={"CONSENT": "YES+cb", "SOCS": "CAI"})
+            with response:
+                if response.status_code == 404:
+                    self.channel_resolver.store_failure(channel_url, "HTTP 404")
+                    logger.warning(f"Kanal bulunamadi (404): {channel_url}")
+                    return None
+                response.raise_for_status()
+                buffer = b""
+                read = 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    read += len(chunk)
+                    # Onceki parcanin sonu da aranir - eslesme iki parcaya bolunmus olabilir
+                    buffer = buffer[-256:] + chunk
+                    match = CHANNEL_ID_PATTERN.search(buffer)
+                    if match:
+                        found = next(group for group in match.groups() if group).decode("ascii")
+                        break
+                    if read > self.channel_page_max_bytes:
+                        break
+        if found:
+            self.channel_resolver.store(channel_url, found)
+            logger.info(f"Channel ID cozuldu: {channel_url} -> {found}")
+        return found
+    
+    def get_channel_id(self, channel_url):
+        """URL'den veya cozum cache'inden channel ID - cache'te yoksa sayfadan cozulur"""
+        if "/channel/" in channel_url:
+            return channel_url.split("/channel/")[1].split("/")[0]
+        cached = self.channel_resolver.lookup(channel_url)
+        if cached:
+            return cached[0]
+        try:
+            return self.resolve_channel_id(channel_url)
+        except Exception as e:
+            logger.warning(f"Channel ID cozulemedi {channel_url}: {e}")
+            return None
+    
+    def resolve_channels(self, channels):
+        """Cozulmemis veya suresi dolmus handle / custom URL'leri paralel coz"""
+        pending = [
+            channel_url for channel_url in channels
+            if "/channel/" not in channel_url and self.channel_resolver.lookup(channel_url) is None
+        ]
+        if not pending:
+            return 0
+        started = time.monotonic()
+        workers = max(1, min(self.feed_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolve") as pool:
+            resolved = sum(1 for channel_id in pool.map(self.get_channel_id, pending) if channel_id)
+        logger.info(f"Kanal cozumleme: {resolved}/{len(pending)} URL channel ID'ye cevrildi, {time.monotonic() - started:.2f} sn")
+        return resolved
     
     def get_channel_latest_videos_rss(self, channel_url):
-        """RSS Feed ile video listesi al - Bot koruması yok!"""
+        """RSS Feed ile video listesi al - Bot koruması yok!
+        
+        Bos liste yeni video olmadigini, None feed'in alinamadigini gosterir.
+        """
         logger.info(f"RSS Feed ile kanal kontrol ediliyor: {channel_url}")
         
-        # Extract channel ID from URL
-        channel_id = None
-        if "/channel/" in channel_url:
-            channel_id = channel_url.split("/channel/")[1].split("/")[0]
-        else:
-            logger.error("Channel ID bulunamadi - sadece /channel/ URL'leri destekleniyor")
-            return []
+        # /channel/ URL'si veya cozulmus handle / custom URL
+        channel_id = self.get_channel_id(channel_url)
+        if not channel_id:
+            logger.error(f"Channel ID bulunamadi: {channel_url}")
+            return None
         
         # YouTube RSS Feed URL
-        rss_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+        rss_url = f"{self.feed_base_url}?channel_id={channel_id}"
         logger.info(f"RSS URL: {rss_url}")
         
         try:
-            # RSS Feed al
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            }
+            # RSS Feed al - User-Agent session'da
+            headers = {}
             
-            response = requests.get(rss_url, headers=headers, timeout=10)
-            response.raise_for_status()
+            # Conditional GET - feed degismediyse 304 doner
+            cached = self.get_cached_feed(channel_id)
+            if cached:
+                if cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
             
-            # XML parse et
-            root = ET.fromstring(response.content)
+            # Host limiti govde okunup baglanti havuza donene kadar tutulur
+            published = []
+            with self.get_host_slot(rss_url):
+                self.feed_rate.acquire()
+                with metrics.timer("feed_fetch_seconds"):
+                    response = self.http.get(rss_url, headers=headers, timeout=10, stream=True)
+                
+                with response:
+                    if response.status_code == 304 and cached:
+                        # Bos govdeyi oku ki baglanti havuza geri donsun
+                        response.content
+                        self.count_feed_cache("not_modified")
+                        self.record_upload_history(channel_url, cached.get("published"))
+                        logger.info(f"RSS Feed degismemis (304): {channel_id}")
+                        return [dict(video) for video in cached["videos"]]
+                    
+                    response.raise_for_status()
+                    
+                    # Feed en yeniden eskiye - bilinen videoya gelince parse etmeyi birak
+                    chunks = self.limit_stream(response.iter_content(chunk_size=8192))
+                    with metrics.timer("feed_parse_seconds"):
+                        result = self.parse_feed_stream(
+                            chunks,
+                            cached=cached,
+                            known_videos=self.load_downloaded_videos(),
+                            published=published
+                        )
+                    self.drain_response(response, chunks)
             
-            # Namespace tanımları
-            namespaces = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'yt': 'http://www.youtube.com/xml/schemas/2015',
-                'media': 'http://search.yahoo.com/mrss/'
-            }
+            # Okunan kisim ayniysa parse edilmedi
+            if result is None:
+                self.count_feed_cache("unchanged")
+                self.record_upload_history(channel_url, cached.get("published"))
+                logger.info(f"RSS Feed icerigi ayni: {channel_id}")
+                return [dict(video) for video in cached["videos"]]
             
-            videos = []
-            entries = root.findall('atom:entry', namespaces)
+            self.count_feed_cache("miss")
+            videos, content_hash, hash_bytes = result
             
-            for entry in entries[:self.max_videos]:
-                # Video ID
-                video_id = entry.find('yt:videoId', namespaces)
-                if video_id is not None:
-                    vid_id = video_id.text
-                    
-                    # Video title
-                    title_elem = entry.find('atom:title', namespaces)
-                    title = title_elem.text if title_elem is not None else "Unknown Title"
-                    
-                    # Channel name
-                    author_elem = entry.find('atom:author/atom:name', namespaces)
-                    uploader = author_elem.text if author_elem is not None else "Unknown Channel"
-                    
-                    videos.append({
-                        "id": vid_id,
-                        "title": title,
-                        "url": f"https://www.youtube.com/watch?v={vid_id}",
-                        "uploader": uploader
-                    })
+            # Yukleme gecmisi cache'te kalir - yeniden baslayan daemon tarama araligini kaybetmez
+            with self.feed_cache_lock:
+                previous = (self.feed_cache.get(channel_id) or {}).get("published")
+            history = self.record_upload_history(
+                channel_url, [parse_timestamp(value) for value in published] + (previous or [])
+            )
+            with self.feed_cache_lock:
+                self.feed_cache[channel_id] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "hash": content_hash,
+                    "hash_bytes": hash_bytes,
+                    "max_videos": self.max_videos,
+                    "videos": videos,
+                    "published": history
+                }
             
             logger.info(f"RSS Feed ile {len(videos)} video bulundu!")
-            return videos
+            return [dict(video) for video in videos]
             
         except Exception as e:
             logger.error(f"RSS Feed hatasi: {e}")
-            return []
+            return None
+    
+    def parse_feed_entry(self, entry):
+        # Video ID
+        vid_id = entry.findtext('yt:videoId', None, FEED_NAMESPACES)
+        if not vid_id:
+            return None
+        
+        # Kucuk resim - sonraki asamalar icin
+        thumbnail_elem = entry.find('media:group/media:thumbnail', FEED_NAMESPACES)
+        
+        return {
+            "id": vid_id,
+            "title": entry.findtext('atom:title', "Unknown Title", FEED_NAMESPACES),
+            "url": f"https://www.youtube.com/watch?v={vid_id}",
+            "uploader": entry.findtext('atom:author/atom:name', "Unknown Channel", FEED_NAMESPACES),
+            "published": entry.findtext('atom:published', None, FEED_NAMESPACES),
+            "updated": entry.findtext('atom:updated', None, FEED_NAMESPACES),
+            "thumbnail": thumbnail_elem.get("url") if thumbnail_elem is not None else None
+        }
+    
+    def parse_feed_stream(self, chunks, cached=None, known_videos=None, published=None):
+        """Atom feed'i parca parca parse et - max_videos'a veya bilinen videoya gelince dur
+        
+        Onceki okumanin hash'i verilirse ayni uzunluktaki onek once kontrol edilir,
+        ayniysa hic parse etmeden None doner. Aksi halde (videolar, hash, okunan byte).
+        published listesi verilirse okunan her entry'nin (bilinen dahil) yayin zamani eklenir,
+        tarama araligi icin en az iki zaman toplanana kadar okumaya devam edilir.
+        """
+        parser = ET.XMLPullParser(events=("end",))
+        entry_tag = "{%s}entry" % FEED_NAMESPACES["atom"]
+        digest = hashlib.sha256()
+        consumed = 0
+        videos = []
+        finished = False
+        stopped = False
+        
+        # Onek kontrolu bitene kadar parca parse edilmez, bekletilir
+        check = cached if cached and cached.get("hash") and cached.get("hash_bytes") else None
+        check_digest = hashlib.sha256()
+        pending = []
+        
+        def handle(data):
+            nonlocal stopped
+            parser.feed(data)
+            for _, elem in parser.read_events():
+                if elem.tag != entry_tag:
+                    continue
+                video = self.parse_feed_entry(elem)
+                elem.clear()
+                if video is None:
+                    continue
+                if published is not None and video["published"]:
+                    published.append(video["published"])
+                if not stopped:
+                    if known_videos is not None and video["id"] in known_videos:
+                        stopped = True
+                    else:
+                        videos.append(video)
+                        stopped = len(videos) >= self.max_videos
+                if stopped and (published is None or len(published) >= 2):
+                    return True
+            return False
+        
+        for chunk in chunks:
+            if not chunk:
+                continue
+            check_offset = consumed
+            digest.update(chunk)
+            consumed += len(chunk)
+            
+            if check:
+                check_digest.update(chunk[:check["hash_bytes"] - check_offset])
+                pending.append(chunk)
+                if consumed < check["hash_bytes"]:
+                    continue
+                if check_digest.hexdigest() == check["hash"]:
+                    return None
+                check = None
+                chunk = b"".join(pending)
+                pending = []
+            
+            if handle(chunk):
+                finished = True
+                break
+        
+        # Feed onceki okumadan kisa - bekleyen parcalari parse et
+        if pending and not finished:
+            finished = handle(b"".join(pending))
+        if not finished:
+            parser.close()
+        
+        return videos, digest.hexdigest(), consumed
+    
     def get_channel_latest_videos(self, channel_url):
         logger.info(f"Kanal kontrol ediliyor: {channel_url}")
+        source_url = channel_url
+        
+        # Cozulemeyen ve yt-dlp ile de acilamayan kanal - negatif TTL dolana kadar atla
+        cached = self.channel_resolver.lookup(channel_url) if "/channel/" not in channel_url else None
+        if cached and cached[0] is None:
+            logger.info(f"Kanal atlandi, onceki denemeler basarisiz ({cached[1]}): {channel_url}")
+            metrics.inc("channel_source_total", source="negative_cache", result="skip")
+            return []
         
         # Önce RSS Feed dene - En stabil yöntem!
         videos = self.get_channel_latest_videos_rss(channel_url)
-        if videos:
+        metrics.inc("channel_source_total", source="rss", result="fail" if videos is None else "ok")
+        if videos is not None:
             return videos
         
-        logger.warning("RSS Feed basarisiz - Chrome cookies deneniyor...")
+        logger.warning("RSS Feed basarisiz - yt-dlp ile kanal listeleniyor...")
         
         # Handle URL warning
         if "/@" in channel_url:
             logger.warning("Handle URL tespit edildi. Daha stabil bir 'channel' veya 'c/' URL kullanilmasi onerilir.")
         
-        # Safe /videos addition with format detection
-        if "/channel/" in channel_url:
-            if not channel_url.endswith("/videos"):
-                channel_url = channel_url.rstrip("/") + "/videos"
-        elif "/c/" in channel_url:
-            if not channel_url.endswith("/videos"):
-                channel_url = channel_url.rstrip("/") + "/videos"
-        elif "/@" in channel_url:
-            if not channel_url.endswith("/videos"):
-                channel_url = channel_url.rstrip("/") + "/videos"
-        
-        logger.info(f"Final URL: {channel_url}")
-        
-        # First try with Chrome cookies
-        ydl_opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "extract_flat": True,
-            "playlistend": self.max_videos,
-            "cookies_from_browser": ("chrome", None, None, None),
-            "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        }
-        
-        try:
-            logger.info("Chrome cookie'leri ile deneniyor...")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(channel_url, download=False)
-                if "entries" in info:
-                    videos = []
-                    for entry in info["entries"][:self.max_videos]:
-                        if entry and entry.get("id") and len(entry.get("id", "")) == 11:
-                            videos.append({
-                                "id": entry.get("id"),
-                                "title": entry.get("title"),
-                                "url": f"https://www.youtube.com/watch?v={entry.get('id')}",
-                                "uploader": info.get("uploader", "Unknown")
-                            })
-                    logger.info(f"Chrome cookie'leri ile {len(videos)} video bulundu!")
-                    return videos
-                else:
-                    logger.warning(f"Chrome cookie'leri ile videolara erisilemedi")
-                    
-        except Exception as e:
-            logger.warning(f"Chrome cookie'leri basarisiz: {e}")
+        cursor = self.channel_cursors.get(source_url)
+        error = "yt-dlp: kullanilabilir strateji yok"
+        for strategy, ydl_opts in self.get_listing_strategies():
+            try:
+                logger.info(f"{strategy} ile kanal listeleniyor...")
+                videos = []
+                newest = None
+                # Yeniden eskiye - onceki taramada gorulen veya indirilmis videoya gelince sonraki sayfalar istenmez
+                for video in self.enumerate_channel(channel_url, ydl_opts, source_url):
+                    newest = newest or video["id"]
+                    if video["id"] == cursor["last_video_id"] or video["id"] in self.video_store:
+                        break
+                    videos.append(video)
+                    if len(videos) >= self.max_videos:
+                        break
+                if newest:
+                    self.channel_cursors.set_latest(source_url, newest)
+                logger.info(f"{strategy} ile {len(videos)} yeni video bulundu!")
+                metrics.inc("channel_source_total", source=strategy, result="ok")
+                return videos
+            except Exception as e:
+                error = str(e)
+                logger.warning(f"{strategy} basarisiz: {e}")
+                metrics.inc("channel_source_total", source=strategy, result="fail")
+                self.check_browser_cookie_error(strategy, e)
         
-        # Fallback to Android client
-        logger.info("Fallback: Android client deneniyor...")
-        ydl_opts_fallback = {
+        logger.error(f"Kanal listelenemedi {channel_url}: {error}")
+        self.remember_channel_failure(source_url, error)
+        return []
+    
+    def get_channel_videos_url(self, channel_url):
+        """Kanalin yuklemeler sekmesi - /channel/, /c/ ve /@ URL'lerine /videos eklenir"""
+        if any(part in channel_url for part in ("/channel/", "/c/", "/@")) and not channel_url.rstrip("/").endswith("/videos"):
+            return channel_url.rstrip("/") + "/videos"
+        return channel_url
+    
+    def browser_cookies_available(self):
+        """Tarayici profili yoksa (headless container) cookie stratejisi bir kere tespit edilip atlanir"""
+        if self.browser_cookies is None:
+            if not self.browser:
+                self.browser_cookies = False
+            elif self.browser in ("chrome", "chromium"):
+                profiles = ["~/.config/google-chrome", "~/.config/chromium", "~/snap/chromium/common/chromium"]
+                self.browser_cookies = any(os.path.isdir(os.path.expanduser(path)) for path in profiles)
+            else:
+                # Diger tarayicilar icin ilk denemenin sonucu belirler
+                self.browser_cookies = True
+            if not self.browser_cookies:
+                logger.info(f"Tarayici cookie'leri kullanilamiyor ({self.browser or 'kapali'}) - bu strateji atlanacak")
+        return self.browser_cookies
+    
+    def check_browser_cookie_error(self, strategy, error):
+        if strategy != "browser_cookie":
+            return
+        message = str(error).lower()
+        if "could not find" in message or "cookies database" in message or "keyring" in message:
+            self.browser_cookies = False
+            logger.info("Tarayici cookie veritabani bulunamadi - bu strateji bir daha denenmeyecek")
+    
+    def get_listing_strategies(self):
+        """Kanal listeleme icin yt-dlp ayarlari - kullanilamayan stratejiler listede yer almaz"""
+        strategies = []
+        if self.browser_cookies_available():
+            strategies.append(("browser_cookie", {
+                "quiet": True,
+                "no_warnings": True,
+                "cookies_from_browser": (self.browser, None, None, None),
+                "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            }))
+        strategies.append(("android", {
             "quiet": True,
             "no_warnings": True,
-            "extract_flat": True,
-            "playlistend": self.max_videos,
             "user_agent": "com.google.android.youtube/17.36.4 (Linux; U; Android 12; TR) gzip",
             "extractor_args": {
                 "youtube": {
@@ -417,91 +2881,314 @@ class YouTubeDownloader:
                     "player_skip": ["webpage", "configs"]
                 }
             }
-        }
+        }))
+        return strategies
+    
+    def enumerate_channel(self, channel_url, ydl_opts, source_url=None, start=0):
+        """Kanal yuklemelerini yeniden eskiye uret - sayfalar ancak tuketildikce istenir
+        
+        process=False ile entries yt-dlp'nin sayfa sayfa ilerleyen generator'u olarak kalir,
+        dongu erken biterse sonraki devam (continuation) sayfalari hic indirilmez.
+        """
+        import yt_dlp
         
+        with yt_dlp.YoutubeDL({**ydl_opts, "extract_flat": "in_playlist"}) as ydl:
+            info = ydl.extract_info(self.get_channel_videos_url(channel_url), download=False, process=False)
+            if not info or "entries" not in info:
+                raise ValueError("kanal videolarina erisilemedi")
+            self.remember_channel_id(source_url or channel_url, info)
+            uploader = info.get("uploader") or info.get("channel") or "Unknown"
+            position = 0
+            for entry in info["entries"]:
+                position += 1
+                if position <= start:
+                    continue
+                video_id = (entry or {}).get("id")
+                if not video_id or len(video_id) != 11:
+                    continue
+                yield {
+                    "id": video_id,
+                    "title": entry.get("title"),
+                    "url": f"https://www.youtube.com/watch?v={video_id}",
+                    "uploader": uploader,
+                    "position": position
+                }
+    
+    def remember_channel_id(self, channel_url, info):
+        """yt-dlp sonucundaki channel ID - sonraki taramalar RSS yolunu kullanir"""
+        channel_id = info.get("channel_id")
+        if "/channel/" in channel_url or not channel_id or not channel_id.startswith("UC"):
+            return
         try:
-            with yt_dlp.YoutubeDL(ydl_opts_fallback) as ydl:
-                info = ydl.extract_info(channel_url, download=False)
-                if "entries" in info:
-                    videos = []
-                    for entry in info["entries"][:self.max_videos]:
-                        if entry and entry.get("id") and len(entry.get("id", "")) == 11:
-                            videos.append({
-                                "id": entry.get("id"),
-                                "title": entry.get("title"),
-                                "url": f"https://www.youtube.com/watch?v={entry.get('id')}",
-                                "uploader": info.get("uploader", "Unknown")
-                            })
-                    logger.info(f"Android client ile {len(videos)} video bulundu!")
-                    return videos
-                else:
-                    logger.warning(f"Android client ile videolara erisilemedi")
-                    return []
-                    
+            self.channel_resolver.store(channel_url, channel_id)
         except Exception as e:
-            logger.error(f"Android client de basarisiz: {e}")
-            return []
+            logger.error(f"Channel ID kaydedilemedi: {e}")
     
-    def load_downloaded_videos(self):
-        db_file = "downloaded_videos.json"
+    def remember_channel_failure(self, channel_url, error):
+        if "/channel/" in channel_url:
+            return
         try:
-            if os.path.exists(db_file):
-                with open(db_file, "r", encoding="utf-8") as f:
-                    return set(json.load(f))
-            return set()
+            self.channel_resolver.store_failure(channel_url, error[:200])
         except Exception as e:
-            logger.error(f"Indirilen video veritabani yuklenemedi: {e}")
-            return set()
+            logger.error(f"Channel ID hatasi kaydedilemedi: {e}")
+    
+    def load_downloaded_videos(self):
+        """Set gibi davranan veritabani - `video_id in ...` indeksli sorgu yapar"""
+        return self.video_store
     
-    def save_downloaded_video(self, video_id):
-        db_file = "downloaded_videos.json"
+    def save_downloaded_video(self, video_id, video_info=None, file_path=None, channel=None):
         try:
-            downloaded = self.load_downloaded_videos()
-            downloaded.add(video_id)
-            with open(db_file, "w", encoding="utf-8") as f:
-                json.dump(list(downloaded), f, ensure_ascii=False, indent=2)
+            video_info = video_info or {}
+            file_size = None
+            if not isinstance(file_path, str):
+                file_path = None
+            elif os.path.exists(file_path):
+                file_size = os.path.getsize(file_path)
+            self.video_store.add(
+                video_id,
+                channel=channel or video_info.get("channel_url") or video_info.get("uploader"),
+                title=video_info.get("title"),
+                file_path=file_path,
+                file_size=file_size,
+                sidecars=video_info.get("_sidecars")
+            )
         except Exception as e:
             logger.error(f"Indirilen video veritabani kaydedilemedi: {e}")
     
+    def fetch_channel_videos(self, channel_url):
+        try:
+            videos = self.get_channel_latest_videos(channel_url)
+        except Exception as e:
+            logger.error(f"Kanal isleme hatasi {channel_url}: {e}")
+            return []
+        
+        self.record_upload_history(channel_url, [parse_timestamp(video.get("published")) for video in videos])
+        return videos
+    
+    def record_upload_history(self, channel_url, published):
+        """Yukleme zamanlarini kanal gecmisine ekle - en yeni UPLOAD_HISTORY_SIZE zaman tutulur"""
+        history = set(self.upload_history.get(channel_url) or [])
+        history.update(ts for ts in published or [] if ts)
+        history = sorted(history, reverse=True)[:self.upload_history_size]
+        if history:
+            self.upload_history[channel_url] = history
+        return history
+    
+    def get_poll_interval(self, channel_url):
+        """Yukleme sikligina gore tarama araligi - aktif kanal sik, uykudaki kanal seyrek"""
+        published = sorted(self.upload_history.get(channel_url) or [], reverse=True)
+        if len(published) < 2:
+            return self.daemon_default_interval
+        
+        gaps = [newer - older for newer, older in zip(published, published[1:])]
+        avg_gap = sum(gaps) / len(gaps)
+        # Son yuklemeden bu yana gecen sure ortalamayi astiysa kanal uykuda sayilir
+        idle = max(0, time.time() - published[0])
+        interval = max(avg_gap, idle) * self.daemon_poll_factor
+        return min(max(interval, self.daemon_min_interval), self.daemon_max_interval)
+    
+    def poll_channels(self, downloaded_videos=None, channels=None, fetch=None):
+        """Tum kanal feed'lerini paralel tara, yeni videolari tek kuyrukta birlestir"""
+        if downloaded_videos is None:
+            downloaded_videos = self.load_downloaded_videos()
+        if channels is None:
+            channels = self.channels
+        if fetch is None:
+            fetch = self.fetch_channel_videos
+        
+        started = time.monotonic()
+        self.feed_cache_stats = {"not_modified": 0, "unchanged": 0, "miss": 0}
+        workers = max(1, min(self.feed_workers, len(channels)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed") as pool:
+            results = list(pool.map(fetch, channels))
+        
+        new_videos = self.plan_sweep(channels, results, downloaded_videos)
+        self.save_feed_cache()
+        
+        elapsed = time.monotonic() - started
+        logger.info(f"Feed taramasi tamamlandi: {len(channels)} kanal, {len(new_videos)} yeni video, {elapsed:.2f} sn")
+        return new_videos
+    
+    def plan_sweep(self, channels, results, downloaded_videos):
+        """Tum kanallarin adaylarini topla, bilinenleri tek toplu sorguyla ele - sadece yeniler doner"""
+        # Kanal sirasini koru, ayni video iki kanalda cikarsa bir kez al
+        candidates = []
+        seen = set()
+        for channel_url, videos in zip(channels, results):
+            for video in videos:
+                if video["id"] in seen:
+                    continue
+                seen.add(video["id"])
+                video["channel"] = channel_url
+                candidates.append(video)
+        if not candidates:
+            return []
+        
+        ids = [video["id"] for video in candidates]
+        if hasattr(downloaded_videos, "known"):
+            known = downloaded_videos.known(ids)
+        else:
+            known = {video_id for video_id in ids if video_id in downloaded_videos}
+        
+        # Bilinen videolar feed cache'ten de dusulur - degismeyen feed bir sonraki taramada bos liste doner
+        if known:
+            with self.feed_cache_lock:
+                for cached in self.feed_cache.values():
+                    if any(video["id"] in known for video in cached["videos"]):
+                        cached["videos"] = [video for video in cached["videos"] if video["id"] not in known]
+        
+        logger.debug(f"Tarama plani: {len(candidates)} aday, {len(known)} zaten indirilmis")
+        return [video for video in candidates if video["id"] not in known]
+    
+    def process_video(self, video):
+        """Tek video isi - ayni ID baska worker'da isleniyorsa onun sonucu kullanilir"""
+        result, shared = self.video_flight.do(video["id"], lambda: self.fetch_video(video))
+        if shared:
+            # Sonuc ilk worker'in isinde sayildi
+            logger.info(f"Video baska bir worker tarafindan islendi: {video['id']}")
+            return JOB_SKIPPED
+        return result
+    
+    def fetch_video(self, video):
+        """Bilgi al, indir, veritabanina kaydet (worker thread'inde calisir)"""
+        with self.video_locks.hold(video["id"]) as acquired:
+            if not acquired:
+                logger.info(f"Video baska bir process'te isleniyor, atlandi: {video['id']}")
+                return JOB_SKIPPED
+            # Kuyrukta beklerken baska bir is indirmis olabilir
+            if video["id"] in self.video_store:
+                logger.info(f"Video zaten indirilmis, atlandi: {video['id']}")
+                self.journal.set_state(video["id"], "done")
+                return JOB_SKIPPED
+            return self.download_new_video(video)
+    
+    def download_new_video(self, video):
+        logger.info(f"Yeni video bulundu: {video['title']}")
+        
+        # Video bilgisini almadan önce bekleme
+        self.journal.set_state(video["id"], "fetching_info")
+        time.sleep(self.info_delay)
+        video_info = self.get_video_info(video["url"])
+        
+        self.journal.set_state(video["id"], "downloading")
+        file_path = self.download_video(video["url"], video_info)
+        if file_path:
+            self.save_downloaded_video(video["id"], video_info, file_path, channel=video.get("channel"))
+            # Son islem varsa is pipeline bitene kadar acik kalir
+            self.journal.set_state(video["id"], "pipeline_pending" if self.postprocess else "done")
+            if self.sidecars and video_info:
+                self.sidecars.submit(video["id"], video_info, channel=video.get("channel"))
+            if self.postprocess:
+                self.postprocess.submit(video["id"], file_path)
+            
+            # Uzun bekleme süresi - bot algılamasını azaltır (worker basina)
+            time.sleep(self.download_cooldown)
+        else:
+            self.record_job_failure(video["id"], "Video indirilemedi")
+        return file_path
+    
+    def record_job_failure(self, video_id, error):
+        next_attempt_at = self.journal.fail(video_id, error)
+        if next_attempt_at:
+            logger.warning(f"Is basarisiz, tekrar denenecek: {video_id} ({next_attempt_at - time.time():.0f} sn sonra)")
+        else:
+            logger.error(f"Is kalici olarak basarisiz: {video_id}")
+    
+    def claim_channels(self, channels):
+        """Cluster modunda sadece bu node'a dusen kanallar"""
+        if not self.cluster:
+            return channels
+        try:
+            return self.cluster.claim_channels(channels)
+        except Exception as e:
+            logger.error(f"Cluster kanal dagitimi basarisiz: {e}")
+            return []
+    
+    def queue_video(self, scheduler, video):
+        scheduler.submit(video, video.get("channel"), parse_timestamp(video.get("published")))
+    
+    def submit_new_videos(self, scheduler, videos):
+        """Yeni videolari once journal'a yaz, sonra indirme kuyruguna ekle"""
+        submitted = []
+        for video in videos:
+            if not self.journal.enqueue(video):
+                logger.debug(f"Video zaten islemde veya retry bekliyor: {video['id']}")
+                continue
+            submitted.append(video)
+            self.queue_video(scheduler, video)
+        return submitted
+    
+    def resume_jobs(self):
+        """Onceki calismadan yarim kalan ve retry zamani gelen isler"""
+        live_nodes = self.cluster.live_nodes() if self.cluster else None
+        jobs = self.journal.resumable(live_nodes)
+        for job in jobs:
+            logger.info(f"Is devam ettiriliyor ({job['resumed_from']}): {job['title']}")
+        return jobs
+    
+    def requeue_retries(self, scheduler, in_flight):
+        """Bekleme suresi dolan basarisiz isler - daemon her turda kuyruga geri ekler"""
+        try:
+            jobs = self.journal.resumable(retries_only=True)
+        except Exception as e:
+            logger.error(f"Retry isleri okunamadi: {e}")
+            return
+        for job in jobs:
+            if job["id"] in in_flight:
+                continue
+            logger.info(f"Basarisiz is tekrar deneniyor: {job['title']}")
+            in_flight.add(job["id"])
+            self.queue_video(scheduler, job)
+    
     def monitor_channels(self):
         logger.info("Kanal monitorleme baslatildi")
         logger.info(f"Environment YOUTUBE_CHANNELS: {os.getenv('YOUTUBE_CHANNELS', 'TANIMSIZ')}")
         logger.info(f"Kullanilacak kanallar: {self.channels}")
         
         downloaded_videos = self.load_downloaded_videos()
-        new_downloads = 0
+        self.start_metrics_server()
         
-        for channel_url in self.channels:
-            try:
-                videos = self.get_channel_latest_videos(channel_url)
-                
-                # Kanal listesi alındıktan sonra kısa bekleme
-                time.sleep(3)
-                
-                for video in videos:
-                    video_id = video["id"]
-                    
-                    if video_id not in downloaded_videos:
-                        logger.info(f"Yeni video bulundu: {video['title']}")
-                        
-                        # Video bilgisini almadan önce bekleme
-                        time.sleep(2)
-                        video_info = self.get_video_info(video["url"])
-                        
-                        if self.download_video(video["url"], video_info):
-                            self.save_downloaded_video(video_id)
-                            new_downloads += 1
-                            
-                            # Çok uzun bekleme süresi - bot algılamasını azaltır
-                            time.sleep(15)
-                    else:
-                        logger.debug(f"Video zaten indirilmis: {video['title']}")
-                        
-            except Exception as e:
-                logger.error(f"Kanal isleme hatasi {channel_url}: {e}")
-                continue
+        # PROFILE_DIR verilirse feed ve indirme asamalari ayri ayri profillenir
+        profiler = StageProfiler(self.profile_dir) if self.profile_dir else None
+        fetch = profiler.wrap("feed", self.fetch_channel_videos) if profiler else None
+        handler = profiler.wrap("download", self.process_video) if profiler else self.process_video
+        
+        if self.cluster:
+            self.cluster.start()
+        if self.postprocess:
+            self.postprocess.start()
+        self.resume_postprocess()
         
-        logger.info(f"Monitorleme tamamlandi. {new_downloads} yeni video indirildi.")
+        scheduler = DownloadScheduler(handler, workers=self.download_workers)
+        metrics.set_function("download_queue_depth", scheduler.depth)
+        scheduler.start()
+        for job in self.resume_jobs():
+            self.queue_video(scheduler, job)
+        channels = self.claim_channels(self.channels)
+        self.resolve_channels(channels)
+        self.submit_new_videos(scheduler, self.poll_channels(downloaded_videos, channels=channels, fetch=fetch))
+        logger.info(f"Indirme kuyrugu: {scheduler.depth()} video, {scheduler.workers} worker")
+        scheduler.join()
+        if self.cluster:
+            self.cluster.stop()
+        self.finish_sidecars()
+        self.finish_postprocess()
+        if profiler:
+            profiler.dump()
+        
+        summary = scheduler.summary()
+        new_downloads = summary["succeeded"]
+        
+        logger.info(f"Monitorleme tamamlandi. {new_downloads} yeni video indirildi, {summary['skipped']} video atlandi.")
+        if summary["jobs"]:
+            logger.info(f"Indirme metrikleri: ort. kuyruk {summary['avg_queue_wait']:.1f} sn (p95 {summary['p95_queue_wait']:.1f} sn), ort. transfer {summary['avg_transfer_time']:.1f} sn, {summary['throughput'] / 1e6:.2f} MB/sn")
+        
+        cache_stats = self.feed_cache_stats
+        cache_hits = cache_stats["not_modified"] + cache_stats["unchanged"]
+        logger.info(f"Feed cache: {cache_hits} hit ({cache_stats['not_modified']} x 304, {cache_stats['unchanged']} x ayni icerik), {cache_stats['miss']} miss")
+        self.log_http_stats()
+        if self.cookies.count:
+            logger.info(f"Cookie sonuclari: {self.cookies.summary()}")
         
         if new_downloads == 0:
             print("Kanal monitorleme tamamlandi. Yeni video bulunamadi.")
@@ -510,85 +3197,372 @@ class YouTubeDownloader:
         
         return new_downloads
     
+    def finish_sidecars(self, cancel=False):
+        """Altyazi / metadata kuyrugunu bitir - medya indirmeleri bunu beklemeden tamamlanir"""
+        if not self.sidecars:
+            return
+        self.sidecars.join(cancel=cancel)
+        logger.info(f"Altyazi / metadata sonuclari: {self.sidecars.summary()}")
+    
+    def finish_postprocess(self):
+        """Kuyruktaki son islemleri bitir (iptal edildiyse sadece calisanlari bekle)"""
+        if not self.postprocess:
+            return
+        logger.info("Son islem kuyrugu bitiriliyor...")
+        self.postprocess.join()
+        logger.info(f"Son islem sonuclari: {self.postprocess.summary()}")
+    
+    def start_metrics_server(self):
+        if self.metrics_port <= 0 or self.metrics_server:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.metrics_port)
+        except OSError as e:
+            logger.warning(f"Metrik endpoint'i baslatilamadi (port {self.metrics_port}): {e}")
+    
+    def request_stop(self, signum=None, frame=None):
+        logger.info(f"Durdurma sinyali alindi ({signum}) - daemon kapatiliyor...")
+        self.stop_event.set()
+    
+    def run_daemon(self):
+        """Surekli calisan mod - her kanal kendi araliginda taranir, durum bellekte kalir"""
+        logger.info(f"Daemon modu baslatildi: {len(self.channels)} kanal, {self.download_workers} worker")
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        
+        # Kuyruga alinmis ama henuz bitmemis videolar tekrar eklenmesin
+        in_flight = set()
+        
+        def handle(video):
+            try:
+                return self.process_video(video)
+            finally:
+                in_flight.discard(video["id"])
+        
+        self.start_metrics_server()
+        if self.cluster:
+            self.cluster.start()
+        if self.postprocess:
+            self.postprocess.start()
+        self.resume_postprocess()
+        scheduler = DownloadScheduler(handle, workers=self.download_workers)
+        metrics.set_function("download_queue_depth", scheduler.depth)
+        scheduler.start()
+        for job in self.resume_jobs():
+            in_flight.add(job["id"])
+            self.queue_video(scheduler, job)
+        self.resolve_channels(self.channels)
+        
+        # (siradaki tarama zamani, kanal) - ilk turda hepsi hemen taranir
+        now = time.monotonic()
+        schedule = [(now, channel_url) for channel_url in self.channels]
+        heapq.heapify(schedule)
+        
+        while not self.stop_event.is_set():
+            # Feed'de tekrar gorunmeyen (yeni video sonrasi) basarisiz isler journal'dan tekrar denenir
+            self.requeue_retries(scheduler, in_flight)
+            wait = schedule[0][0] - time.monotonic()
+            if wait > 0:
+                self.stop_event.wait(min(wait, self.journal.retry_base))
+                continue
+            
+            now = time.monotonic()
+            due = []
+            while schedule and schedule[0][0] <= now:
+                due.append(heapq.heappop(schedule)[1])
+            
+            # Baska node'a ait kanallar lease suresi dolunca tekrar kontrol edilir (failover)
+            owned = self.claim_channels(due)
+            owned_set = set(owned)
+            for channel_url in due:
+                if channel_url not in owned_set:
+                    heapq.heappush(schedule, (time.monotonic() + self.cluster.lease_ttl, channel_url))
+            
+            # Worker isi bitirip silmeden once eklenmeli, kuyruga girmeyenler geri cikarilir
+            videos = [video for video in self.poll_channels(channels=owned) if video["id"] not in in_flight] if owned else []
+            in_flight.update(video["id"] for video in videos)
+            submitted = {video["id"] for video in self.submit_new_videos(scheduler, videos)}
+            in_flight.difference_update(video["id"] for video in videos if video["id"] not in submitted)
+            
+            for channel_url in owned:
+                interval = self.get_poll_interval(channel_url)
+                heapq.heappush(schedule, (time.monotonic() + interval, channel_url))
+                logger.debug(f"Sonraki tarama {interval:.0f} sn sonra: {channel_url}")
+            
+            self.log_http_stats()
+            logger.info(f"Daemon turu: {len(owned)} kanal tarandi, kuyruk {scheduler.depth()} video, sonraki tarama {max(0, schedule[0][0] - time.monotonic()):.0f} sn sonra")
+        
+        # Baslamamis isler birakilir (sonraki calismada tekrar bulunur), devam edenler bitirilir
+        dropped = scheduler.cancel_pending()
+        logger.info(f"Devam eden indirmeler bitiriliyor... ({dropped} bekleyen is birakildi)")
+        if self.postprocess:
+            self.postprocess.cancel()
+        scheduler.join()
+        if self.cluster:
+            self.cluster.stop()
+        self.finish_sidecars(cancel=True)
+        self.finish_postprocess()
+        
+        summary = scheduler.summary()
+        logger.info(f"Daemon durduruldu. {summary['succeeded']} video indirildi, {summary['skipped']} video atlandi.")
+        print(f"Daemon durduruldu. Toplam {summary['succeeded']} video indirildi.")
+        return summary["succeeded"]
+    
+    def backfill_channels(self, channels=None):
+        """Kanallarin tum yuklemelerini gez - BACKFILL_BATCH'lik partiler, kuyruk dolunca beklenir
+        
+        Ilerleme her partiden sonra kaydedilir, kesilen tarama kaldigi konumdan devam eder.
+        """
+        channels = channels or self.channels
+        logger.info(f"Geriye donuk tarama baslatildi: {len(channels)} kanal, parti {self.backfill_batch}")
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        
+        if self.postprocess:
+            self.postprocess.start()
+        self.resume_postprocess()
+        scheduler = DownloadScheduler(self.process_video, workers=self.download_workers)
+        scheduler.start()
+        for job in self.resume_jobs():
+            self.queue_video(scheduler, job)
+        
+        for channel_url in channels:
+            cursor = self.channel_cursors.get(channel_url)
+            if cursor["backfill_done"]:
+                logger.info(f"Kanal daha once tamamen tarandi: {channel_url}")
+                continue
+            position = cursor["backfill_position"]
+            for strategy, ydl_opts in self.get_listing_strategies():
+                batch = []
+                try:
+                    for video in self.enumerate_channel(channel_url, ydl_opts, start=position):
+                        video["channel"] = channel_url
+                        batch.append(video)
+                        if len(batch) >= self.backfill_batch:
+                            position = self.submit_backfill_batch(scheduler, channel_url, batch)
+                            batch = []
+                        if self.stop_event.is_set():
+                            break
+                    if batch:
+                        position = self.submit_backfill_batch(scheduler, channel_url, batch)
+                    if not self.stop_event.is_set():
+                        self.channel_cursors.set_backfill(channel_url, position, done=True)
+                        logger.info(f"Kanal tamamen tarandi: {channel_url} ({position} video)")
+                    break
+                except Exception as e:
+                    # Sonraki strateji kaydedilen konumdan devam eder
+                    logger.warning(f"Geriye donuk tarama hatasi {channel_url} ({strategy}): {e}")
+                    self.check_browser_cookie_error(strategy, e)
+            if self.stop_event.is_set():
+                break
+        
+        if self.stop_event.is_set():
+            scheduler.cancel_pending()
+            if self.postprocess:
+                self.postprocess.cancel()
+        scheduler.join()
+        self.finish_sidecars(cancel=self.stop_event.is_set())
+        self.finish_postprocess()
+        summary = scheduler.summary()
+        logger.info(f"Geriye donuk tarama bitti. {summary['succeeded']} video indirildi, {summary['skipped']} video atlandi.")
+        return summary["succeeded"]
+    
+    def submit_backfill_batch(self, scheduler, channel_url, batch):
+        """Partideki yeni videolari kuyruga ver, konumu kaydet, kuyruk bir partiye inene kadar bekle"""
+        known = self.video_store.known(video["id"] for video in batch)
+        self.submit_new_videos(scheduler, [video for video in batch if video["id"] not in known])
+        position = batch[-1]["position"]
+        self.channel_cursors.set_backfill(channel_url, position)
+        logger.info(f"Geriye donuk tarama: {channel_url} konum {position}, kuyruk {scheduler.depth()} video")
+        while scheduler.depth() > self.backfill_batch and not self.stop_event.is_set():
+            self.stop_event.wait(1)
+        return position
+    
     def download_single_video(self, url):
         logger.info(f"Manuel video indirme: {url}")
         
-        video_info = self.get_video_info(url)
-        if video_info:
-            success = self.download_video(url, video_info)
-            if success:
-                self.save_downloaded_video(video_info.get("id"))
-            return success
-        return False
+        # ID URL'den cikmiyorsa once bilgi alinir, kilit sadece indirmeyi kapsar
+        video_info = None
+        video_id = parse_video_id(url)
+        if video_id is None:
+            video_info = self.get_video_info(url)
+            if not video_info:
+                return False
+            video_id = video_info.get("id")
+        
+        with self.video_locks.hold(video_id) as acquired:
+            if not acquired:
+                logger.warning(f"Video baska bir process'te isleniyor: {video_id}")
+                return False
+            if video_id in self.video_store:
+                logger.info(f"Video zaten indirilmis: {video_id}")
+                return True
+            if video_info is None:
+                video_info = self.get_video_info(url)
+                if not video_info:
+                    return False
+            
+            self.journal.enqueue({"id": video_id, "url": url, "title": video_info.get("title")})
+            self.journal.set_state(video_id, "downloading")
+            file_path = self.download_video(url, video_info)
+            if file_path:
+                self.save_downloaded_video(video_id, video_info, file_path)
+                self.journal.set_state(video_id, "pipeline_pending" if self.postprocess else "done")
+                if self.sidecars:
+                    self.sidecars.submit(video_id, video_info)
+            else:
+                self.record_job_failure(video_id, "Video indirilemedi")
+        
+        if file_path and self.postprocess:
+            self.postprocess.start()
+            self.postprocess.submit(video_id, file_path)
+            self.finish_postprocess()
+        self.finish_sidecars()
+        return bool(file_path)
+    
+    def delete_video_files(self, file_path, sidecars):
+        """Video ve yan dosyalari tek birim olarak sil - silinen byte"""
+        freed = 0
+        for path in [file_path] + sidecars:
+            try:
+                size = os.path.getsize(path)
+                os.unlink(path)
+                freed += size
+            except FileNotFoundError:
+                pass
+        return freed
+    
+    def apply_retention(self, days=None, max_bytes=None, channel_quota=None):
+        """Veritabanindan silinecekleri sec (dizin taramasi yok), dosyalari paralel sil"""
+        if max_bytes is None:
+            max_bytes = self.retention_max_bytes
+        if channel_quota is None:
+            channel_quota = self.retention_channel_quota
+        cutoff = None
+        if days is not None:
+            cutoff = datetime.fromtimestamp(time.time() - days * 24 * 3600).isoformat()
+        
+        candidates = self.video_store.retention_candidates(cutoff, max_bytes, channel_quota)
+        if not candidates:
+            logger.info("Temizlik tamamlandi. Silinecek video yok.")
+            return 0
+        
+        deleted = []
+        freed = 0
+        
+        def delete(row):
+            video_id, file_path, _, sidecars = row
+            extra = json.loads(sidecars) if sidecars else []
+            if self.postprocess:
+                extra += self.postprocess.outputs(video_id)
+            return video_id, file_path, self.delete_video_files(file_path, extra)
+        
+        with ThreadPoolExecutor(max_workers=self.cleanup_workers, thread_name_prefix="cleanup") as pool:
+            for future in [pool.submit(delete, row) for row in candidates]:
+                try:
+                    video_id, file_path, size = future.result()
+                except Exception as e:
+                    logger.error(f"Dosya silme hatasi: {e}")
+                    continue
+                deleted.append(video_id)
+                freed += size
+                logger.info(f"Eski video silindi: {os.path.basename(file_path)}")
+        
+        self.video_store.mark_deleted(deleted)
+        if self.sidecars:
+            self.sidecars.store.delete_subtitles(deleted)
+        logger.info(f"Temizlik tamamlandi. {len(deleted)} video silindi, {freed / 1e9:.2f} GB bosaltildi.")
+        return len(deleted)
     
     def cleanup_old_videos(self, days=7):
         logger.info(f"Son {days} gunken eski videolar temizleniyor...")
         
         try:
-            download_path = Path(self.download_dir)
-            if not download_path.exists():
-                return
-            
-            current_time = time.time()
-            deleted_count = 0
-            
-            for file_path in download_path.glob("*"):
-                if file_path.is_file():
-                    file_age = current_time - file_path.stat().st_mtime
-                    if file_age > (days * 24 * 3600):
-                        file_path.unlink()
-                        deleted_count += 1
-                        logger.info(f"Eski dosya silindi: {file_path.name}")
-            
-            logger.info(f"Temizlik tamamlandi. {deleted_count} dosya silindi.")
-            
+            return self.apply_retention(days=days)
         except Exception as e:
             logger.error(f"Dosya temizleme hatasi: {e}")
+            return 0
+
+def command_monitor(args):
+    YouTubeDownloader().monitor_channels()
+
+def command_daemon(args):
+    YouTubeDownloader().run_daemon()
+
+def command_download(args):
+    if not args:
+        print_usage()
+        return
+    video_url = args[0]
+    print(f"Tek video indiriliyor: {video_url}")
+    success = YouTubeDownloader().download_single_video(video_url)
+    if success:
+        print("Video basariyla indirildi!")
+    else:
+        print("Video indirilemedi!")
+
+def command_backfill(args):
+    YouTubeDownloader().backfill_channels(args or None)
+
+def command_cleanup(args):
+    days = int(args[0]) if args else 7
+    downloader = YouTubeDownloader(startup=False)
+    downloader.open_storage()
+    downloader.cleanup_old_videos(days)
+
+def command_stats(args):
+    downloader = YouTubeDownloader(startup=False)
+    stats = downloader.summarize_download_stats()
+    print(f"\nToplam indirilen video: {stats['total']}")
+    if stats["recent"]:
+        print(f"\nSon {len(stats['recent'])} indirilen video:")
+        for i, stat in enumerate(stats["recent"], 1):
+            print(f"{i}. {stat['title']} - {stat['uploader']}")
+            print(f"   {stat['timestamp'][:19]}")
+    if stats["channels"]:
+        print("\nKanal bazli:")
+        for channel, summary in sorted(stats["channels"].items(), key=lambda item: -item[1]["count"]):
+            avg_duration = summary["duration"] / summary["count"]
+            speed = summary["bytes"] / summary["download_seconds"] / 1e6 if summary["download_seconds"] else 0
+            print(f"  {channel}: {summary['count']} video, {summary['bytes'] / 1e9:.2f} GB, ort. sure {avg_duration // 60:.0f}:{avg_duration % 60:02.0f}, {speed:.2f} MB/sn")
+    # Veritabani yoksa olusturulmaz - stats salt okunur
+    if os.getenv("SIDECARS", "1") == "1" and os.path.exists(downloader.db_file):
+        videos, tracks, raw, stored = SidecarStore(downloader.db_file).usage()
+        print(f"\nMetadata: {videos} video, altyazi: {tracks} iz, {raw / 1e6:.1f} MB -> {stored / 1e6:.1f} MB (gzip + tekillestirme)")
+
+def print_usage():
+    print("Gecersiz komut!")
+    print("Kullanim:")
+    print("  python main.py monitor          - Kanallari monitor et")
+    print("  python main.py daemon           - Surekli calis, kanallari kendi araliginda tara")
+    print("  python main.py download [URL]   - Tek video indir")
+    print("  python main.py backfill [URL..] - Kanallarin tum eski videolarini indir")
+    print("  python main.py cleanup [days]   - Eski dosyalari temizle")
+    print("  python main.py stats            - Istatistikleri goster")
+
+# yt-dlp ve requests modul yuklenirken degil, onlari kullanan komutun yolunda yuklenir
+COMMANDS = {
+    "monitor": command_monitor,
+    "daemon": command_daemon,
+    "download": command_download,
+    "backfill": command_backfill,
+    "cleanup": command_cleanup,
+    "stats": command_stats,
+}
 
 def main():
     logger.info("=== YouTube Downloader Baslatiliyor ===")
     
     try:
-        downloader = YouTubeDownloader()
-        
         if len(sys.argv) > 1:
-            command = sys.argv[1].lower()
-            
-            if command == "monitor":
-                downloader.monitor_channels()
-                
-            elif command == "download" and len(sys.argv) > 2:
-                video_url = sys.argv[2]
-                print(f"Tek video indiriliyor: {video_url}")
-                success = downloader.download_single_video(video_url)
-                if success:
-                    print("Video basariyla indirildi!")
-                else:
-                    print("Video indirilemedi!")
-                    
-            elif command == "cleanup":
-                days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
-                downloader.cleanup_old_videos(days)
-                
-            elif command == "stats":
-                stats = downloader.load_download_stats()
-                print(f"\nToplam indirilen video: {len(stats)}")
-                if stats:
-                    print("\nSon 5 indirilen video:")
-                    for i, stat in enumerate(stats[-5:], 1):
-                        print(f"{i}. {stat['title']} - {stat['uploader']}")
-                        print(f"   {stat['timestamp'][:19]}")
-                
+            command = COMMANDS.get(sys.argv[1].lower())
+            if command:
+                command(sys.argv[2:])
             else:
-                print("Gecersiz komut!")
-                print("Kullanim:")
-                print("  python main.py monitor          - Kanallari monitor et")
-                print("  python main.py download [URL]   - Tek video indir")
-                print("  python main.py cleanup [days]   - Eski dosyalari temizle")
-                print("  python main.py stats            - Istatistikleri goster")
+                print_usage()
         else:
             print("Varsayilan mod: Kanal monitorleme baslatiliyor...")
-            downloader.monitor_channels()
+            command_monitor([])
             
     except KeyboardInterrupt:
         logger.info("Program kullanici tarafindan durduruldu")